@@ -1,48 +1,127 @@
 # Hospital Management System (HMGMT)
 
+import time
+_import_started = time.perf_counter()
 
-from flask import Flask, render_template, redirect, url_for, flash
+import sys
+from contextlib import contextmanager
+from flask import Flask, Response, abort, render_template, redirect, url_for, flash
 from flask_login import current_user, login_required
 from config import Config
 from extensions import login_manager, supabase_client
 from models import User
+import instrumentation
 
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Initialize extensions with the app
-login_manager.init_app(app)
-login_manager.login_view = 'auth.login'
-
-# User loader for Flask-Login
-@login_manager.user_loader
-def load_user(user_id):
-    return User.get_by_id(user_id)
-
-# Import and register blueprints
-from routes.auth import auth_bp
-from routes.dashboard import dashboard_bp
-from routes.patients import patients_bp
-from routes.appointments import appointments_bp
-from routes.doctors import doctors_bp
-from routes.medical_records import medical_records_bp
-from routes.billing import billing_bp  # New module
-from routes.settings import settings_bp  # New module
-
-app.register_blueprint(auth_bp)
-app.register_blueprint(dashboard_bp)
-app.register_blueprint(patients_bp)
-app.register_blueprint(appointments_bp)
-app.register_blueprint(doctors_bp)
-app.register_blueprint(medical_records_bp)
-app.register_blueprint(billing_bp)  # Register new module
-app.register_blueprint(settings_bp)  # Register new module
-
-@app.route('/')
-def index():
-    if current_user.is_authenticated:
-        return redirect(url_for('dashboard.index'))
-    return redirect(url_for('auth.login'))
+_imports_finished = time.perf_counter()
+
+class StartupReport:
+    """Wall time and newly imported modules for each phase of building the app"""
+
+    def __init__(self):
+        self.phases = [('imports', (_imports_finished - _import_started) * 1000, None)]
+
+    @contextmanager
+    def phase(self, name):
+        started, modules = time.perf_counter(), len(sys.modules)
+        yield
+        self.phases.append((name, (time.perf_counter() - started) * 1000, len(sys.modules) - modules))
+
+    @property
+    def total_ms(self):
+        return sum(ms for name, ms, modules in self.phases)
+
+    def summary(self):
+        return f"Started in {self.total_ms:.1f}ms (" + ', '.join(
+            f"{name} {ms:.1f}ms" for name, ms, modules in self.phases) + ')'
+
+    def lines(self):
+        lines = [f"{name:16} {ms:8.1f}ms" + (f"  {modules} modules" if modules is not None else '')
+                 for name, ms, modules in self.phases]
+        lines.append(f"{'total':16} {self.total_ms:8.1f}ms")
+        lines.append(f"{'data client':16} {'built' if supabase_client.loaded else 'not built yet (lazy)'}")
+        return lines
+
+def create_app(config_class=Config):
+    """Build the application.
+
+    Nothing here talks to the data backend: the client is constructed on the
+    first query, so workers start (and restart) quickly. Background jobs are
+    started by the servers (`flask serve`, `python app.py`), not here.
+    """
+    report = StartupReport()
+    with report.phase('config'):
+        app = Flask(__name__)
+        app.config.from_object(config_class)
+
+    with report.phase('extensions'):
+        # Initialize extensions with the app
+        login_manager.init_app(app)
+        login_manager.login_view = 'auth.login'
+
+        # Per-request query timings, Server-Timing headers and /metrics
+        instrumentation.init_app(app)
+
+        # User loader for Flask-Login
+        @login_manager.user_loader
+        def load_user(user_id):
+            return User.get_by_id(user_id)
+
+    with report.phase('blueprints'):
+        # Import and register blueprints
+        from routes.auth import auth_bp
+        from routes.dashboard import dashboard_bp
+        from routes.patients import patients_bp
+        from routes.appointments import appointments_bp
+        from routes.doctors import doctors_bp
+        from routes.medical_records import medical_records_bp
+        from routes.billing import billing_bp  # New module
+        from routes.settings import settings_bp  # New module
+
+        app.register_blueprint(auth_bp)
+        app.register_blueprint(dashboard_bp)
+        app.register_blueprint(patients_bp)
+        app.register_blueprint(appointments_bp)
+        app.register_blueprint(doctors_bp)
+        app.register_blueprint(medical_records_bp)
+        app.register_blueprint(billing_bp)  # Register new module
+        app.register_blueprint(settings_bp)  # Register new module
+
+        if app.config['DATA_BACKEND'] == 'memory':
+            # Attachments kept by the in-memory backend have no other URL
+            @app.route('/storage/<bucket>/<path:name>')
+            @login_required
+            def memory_storage(bucket, name):
+                stored = supabase_client.storage.get(bucket, name)
+                if stored is None:
+                    abort(404)
+                return Response(stored[0], mimetype=stored[1])
+
+        @app.route('/')
+        def index():
+            if current_user.is_authenticated:
+                return redirect(url_for('dashboard.index'))
+            return redirect(url_for('auth.login'))
+
+    @app.cli.command('startup-report')
+    def startup_report():
+        """Show how long building the app took, phase by phase."""
+        for line in report.lines():
+            print(line)
+
+    from serve import serve_command
+    app.cli.add_command(serve_command)
+
+    app.extensions['startup_report'] = report
+    if app.config['STARTUP_REPORT']:
+        print(report.summary())
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    import os
+    from overdue import start_overdue_scheduler
+    app = create_app()
+    # The reloader re-runs this file in a child that does the serving
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        # Keep invoice statuses current without manual edits
+        start_overdue_scheduler()
+    app.run(debug=True)
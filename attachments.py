@@ -0,0 +1,82 @@
+import hashlib
+import os
+import uuid
+from werkzeug.utils import secure_filename
+from config import Config
+from extensions import supabase_client
+from http_pool import http_pool
+from thumbnails import schedule_thumbnail
+
+ATTACHMENTS_BUCKET = 'medical-attachments'
+
+def attachment_size(file_data):
+    """Size in bytes of an uploaded file, without reading it into memory"""
+    stream = file_data.stream
+    position = stream.tell()
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(position)
+    return size
+
+def size_limit(record_type):
+    if record_type == 'imaging' and Config.IMAGING_MAX_CONTENT_LENGTH:
+        return Config.IMAGING_MAX_CONTENT_LENGTH
+    return Config.MAX_CONTENT_LENGTH
+
+class _HashingChunks:
+    """Iterate a stream in fixed-size chunks, hashing and counting as it goes"""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def __iter__(self):
+        while True:
+            chunk = self.stream.read(self.chunk_size)
+            if not chunk:
+                return
+            self.sha256.update(chunk)
+            self.size += len(chunk)
+            yield chunk
+
+def upload_attachment(file_data, bucket=ATTACHMENTS_BUCKET):
+    """Stream an uploaded file to Supabase storage in chunks.
+
+    Returns (object name, public URL, sha256 hex digest). Memory use is bounded
+    by UPLOAD_CHUNK_SIZE regardless of the file size. A preview is queued for
+    generation once the upload has finished.
+    """
+    filename = secure_filename(file_data.filename)
+    # Generate unique filename
+    unique_filename = f"{uuid.uuid4()}_{filename}"
+
+    file_data.stream.seek(0)
+    chunks = _HashingChunks(file_data.stream, Config.UPLOAD_CHUNK_SIZE)
+    if Config.DATA_BACKEND != 'supabase':
+        # Other backends take the object through the storage client
+        supabase_client.storage.from_(bucket).upload(unique_filename, b''.join(chunks), {
+            'content-type': file_data.mimetype or 'application/octet-stream'
+        })
+        return (unique_filename, supabase_client.storage.from_(bucket).get_public_url(unique_filename),
+                chunks.sha256.hexdigest())
+
+    response = http_pool.client.post(
+        f"{Config.SUPABASE_URL}/storage/v1/object/{bucket}/{unique_filename}",
+        content=iter(chunks),
+        headers={
+            'Authorization': f'Bearer {Config.SUPABASE_SERVICE_KEY}',
+            'apikey': Config.SUPABASE_SERVICE_KEY,
+            'Content-Type': file_data.mimetype or 'application/octet-stream',
+            'cache-control': 'max-age=3600',
+            'x-upsert': 'false'
+        }
+    )
+    response.raise_for_status()
+    # Previews are made in worker processes, which only a shared backend can reach
+    schedule_thumbnail(unique_filename, bucket)
+
+    # Get the public URL
+    public_url = supabase_client.storage.from_(bucket).get_public_url(unique_filename)
+    return unique_filename, public_url, chunks.sha256.hexdigest()
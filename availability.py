@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from config import Config
+from reference_data import doctor_hours
+from scheduling import schedule_index, to_minutes
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+def parse_working_hours(text):
+    """Weekly hours from text like 'mon-fri 09:00-13:00,14:00-17:00; sat 09:00-12:00'.
+
+    Returns a tuple of seven lists of (start, end) minutes, Monday first.
+    Raises ValueError if the text can't be understood.
+    """
+    week = tuple([] for _ in WEEKDAYS)
+    for part in (text or '').split(';'):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            days, ranges = part.split(None, 1)
+            first, _, last = days.lower().partition('-')
+            first_day = WEEKDAYS.index(first)
+            last_day = WEEKDAYS.index(last) if last else first_day
+            for hours in ranges.split(','):
+                start, end = (to_minutes(value.strip()) for value in hours.split('-'))
+                if not 0 <= start < end <= 24 * 60:
+                    raise ValueError
+                for weekday in range(first_day, last_day + 1):
+                    week[weekday].append((start, end))
+        except ValueError:
+            raise ValueError(f"Can't read working hours '{part}', expected e.g. 'mon-fri 09:00-17:00'")
+    return week
+
+@lru_cache(maxsize=256)
+def working_masks(text, slot_minutes):
+    """Per-weekday bitmaps of the slots that lie entirely within working hours"""
+    masks = []
+    for ranges in parse_working_hours(text):
+        mask = 0
+        for start, end in ranges:
+            first = -(-start // slot_minutes)
+            last = end // slot_minutes
+            if last > first:
+                mask |= ((1 << (last - first)) - 1) << first
+        masks.append(mask)
+    return tuple(masks)
+
+def _doctor_masks(doctor, slot_minutes):
+    try:
+        return working_masks(doctor.get('working_hours') or Config.DEFAULT_WORKING_HOURS, slot_minutes)
+    except ValueError:
+        return working_masks(Config.DEFAULT_WORKING_HOURS, slot_minutes)
+
+def free_starts(free, slots):
+    """Bitmap of the slots where `slots` consecutive free slots begin"""
+    starts = free
+    for offset in range(1, slots):
+        starts &= free >> offset
+    return starts
+
+def next_free_slots(department=None, doctor_id=None, start_date=None, count=5, duration=None, days=None):
+    """The earliest `count` free slots among a department's doctors (or one doctor).
+
+    Each day is a bitmap of slots: working hours with booked slots cleared,
+    so finding room for an appointment is a few shifts and ANDs per doctor
+    per day. All days in the window are loaded up front with one query.
+    """
+    slot_minutes = Config.APPOINTMENT_SLOT_MINUTES
+    slots = -(-int(duration or Config.APPOINTMENT_DURATION) // slot_minutes)
+    start_date = start_date or date.today()
+    end_date = start_date + timedelta(days=(days or Config.AVAILABILITY_DAYS) - 1)
+
+    doctors = [doctor for doctor in doctor_hours.get()
+               if (not department or doctor.get('department') == department)
+               and (not doctor_id or str(doctor['id']) == str(doctor_id))]
+    if not doctors:
+        return []
+    schedule_index.load_range([doctor['id'] for doctor in doctors], start_date, end_date)
+
+    now = datetime.now()
+    results = []
+    day = start_date
+    while day <= end_date and len(results) < count:
+        candidates = []
+        for doctor in doctors:
+            free = _doctor_masks(doctor, slot_minutes)[day.weekday()]
+            if not free:
+                continue
+            free &= ~schedule_index.busy_mask(doctor['id'], day.isoformat(), slot_minutes)
+            if day == now.date():
+                # Nothing that has already started
+                free &= ~((1 << -(-(now.hour * 60 + now.minute) // slot_minutes)) - 1)
+            starts = free_starts(free, slots)
+            # Only a doctor's first `count` openings of the day can make the cut
+            for _ in range(count):
+                if not starts:
+                    break
+                lowest = starts & -starts
+                starts ^= lowest
+                minute = (lowest.bit_length() - 1) * slot_minutes
+                candidates.append((minute, doctor['name'], doctor))
+        candidates.sort(key=lambda candidate: candidate[:2])
+        for minute, name, doctor in candidates[:count - len(results)]:
+            results.append({
+                'doctor_id': doctor['id'],
+                'doctor_name': name,
+                'department': doctor.get('department'),
+                'date': day.isoformat(),
+                'time': f'{minute // 60:02d}:{minute % 60:02d}'
+            })
+        day += timedelta(days=1)
+    return results
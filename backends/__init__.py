@@ -0,0 +1,45 @@
+from config import Config
+
+BACKENDS = ('supabase', 'memory')
+
+def create_client():
+    """Data client for the configured DATA_BACKEND.
+
+    'supabase' talks to the project in SUPABASE_URL with the service role
+    key. 'memory' keeps everything in this process (see backends.memory),
+    which needs no credentials and takes network latency out of the picture.
+    """
+    if Config.DATA_BACKEND == 'supabase':
+        import supabase
+        from http_pool import http_pool
+        return supabase.create_client(
+            Config.SUPABASE_URL,
+            Config.SUPABASE_SERVICE_KEY,  # Use service role instead of regular key
+            # Never holds a user session: signing in would swap the service
+            # key for that user's token on every thread's queries
+            supabase.ClientOptions(httpx_client=http_pool.client, persist_session=False, auto_refresh_token=False)
+        )
+    if Config.DATA_BACKEND == 'memory':
+        from backends.memory import MemoryClient
+        return MemoryClient.from_seed(Config.MEMORY_BACKEND_SEED)
+    raise ValueError(f"Unknown DATA_BACKEND '{Config.DATA_BACKEND}', expected one of {', '.join(BACKENDS)}")
+
+def create_auth_client(data_client):
+    """A throwaway auth client for one user's sign up, sign in or sign out.
+
+    Built per call with the anon key so the session it creates belongs to
+    that call alone. It shares the process-wide connection pool, so this
+    costs no new connections. The memory backend keeps no sessions and
+    simply returns the data client's auth.
+    """
+    if Config.DATA_BACKEND == 'supabase':
+        from supabase_auth import SyncGoTrueClient
+        from http_pool import http_pool
+        return SyncGoTrueClient(
+            url=f"{Config.SUPABASE_URL.rstrip('/')}/auth/v1",
+            headers={'apiKey': Config.SUPABASE_KEY, 'Authorization': f'Bearer {Config.SUPABASE_KEY}'},
+            http_client=http_pool.client,
+            persist_session=False,
+            auto_refresh_token=False
+        )
+    return data_client.auth
@@ -0,0 +1,499 @@
+"""In-memory data backend standing in for the Supabase client.
+
+Implements the subset of the postgrest query builder the app uses:
+select with embedded resources (`patients(name)`, `users!doctor_id(name)`),
+eq/neq/gt/gte/lt/lte/in_/ilike/or_ filters (plus `filter` for the regex
+`match`/`imatch` operators), order, limit, range,
+count='exact', insert/update/upsert/delete. Rows live in plain dicts, with
+hash indexes built lazily for equality filters. Auth and storage keep just
+enough state for logging in and attachments.
+
+Data lives in one process: it is lost on exit and isn't shared between
+workers (or with the thumbnail process pool).
+"""
+import copy
+import heapq
+import json
+import re
+import threading
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+class MemoryResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+class _Table:
+    def __init__(self, name):
+        self.name = name
+        self.rows = {}  # id -> row, in insertion order
+        self._indexes = {}
+
+    def index(self, column):
+        """Rows grouped by the value of `column`, rebuilt after writes"""
+        index = self._indexes.get(column)
+        if index is None:
+            index = {}
+            for row in self.rows.values():
+                index.setdefault(_key(row.get(column)), []).append(row)
+            self._indexes[column] = index
+        return index
+
+    def changed(self):
+        self._indexes.clear()
+
+def _key(value):
+    return None if value is None else str(value)
+
+def _split_top_level(text, separator=','):
+    """Split on `separator` outside parentheses and double quotes"""
+    parts, depth, quoted, current, escaped = [], 0, False, [], False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+            continue
+        if char == '\\' and quoted:
+            current.append(char)
+            escaped = True
+            continue
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == separator:
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    if current or parts:
+        parts.append(''.join(current).strip())
+    return [part for part in parts if part]
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r'\\(.)', r'\1', value[1:-1])
+    return value
+
+def _comparable(row_value, value):
+    """Coerce a filter value to the type of the stored value"""
+    if isinstance(row_value, bool):
+        return str(value).lower() in ('true', 't', '1')
+    if isinstance(row_value, (int, float)):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return value
+    return str(value)
+
+def _compare(op, row_value, value):
+    if op == 'is':
+        return row_value is None if str(value).lower() == 'null' else row_value == _comparable(row_value, value)
+    if row_value is None:
+        return op == 'neq'
+    if op == 'in':
+        return _key(row_value) in {_key(item) for item in value}
+    if op in ('like', 'ilike'):
+        pattern = '^' + re.escape(str(value)).replace('%', '.*').replace('_', '.') + '$'
+        return re.match(pattern, str(row_value), re.IGNORECASE if op == 'ilike' else 0) is not None
+    if op in ('match', 'imatch'):
+        return re.search(str(value), str(row_value), re.IGNORECASE if op == 'imatch' else 0) is not None
+    value = _comparable(row_value, value)
+    try:
+        if op == 'eq':
+            return row_value == value
+        if op == 'neq':
+            return row_value != value
+        if op == 'gt':
+            return row_value > value
+        if op == 'gte':
+            return row_value >= value
+        if op == 'lt':
+            return row_value < value
+        if op == 'lte':
+            return row_value <= value
+    except TypeError:
+        return False
+    raise ValueError(f'Unsupported operator: {op}')
+
+def _parse_logic(expression):
+    """Parse a PostgREST logic tree ('a.eq.1,and(b.gt."x",c.lt.2)') into a predicate"""
+    predicates = []
+    for term in _split_top_level(expression):
+        match = re.match(r'^(and|or)\((.*)\)$', term, re.DOTALL)
+        if match:
+            children = _parse_logic(match.group(2))
+            combine = all if match.group(1) == 'and' else any
+            predicates.append(lambda row, children=children, combine=combine:
+                              combine(child(row) for child in children))
+            continue
+        column, op, value = term.split('.', 2)
+        negate = op == 'not'
+        if negate:
+            op, value = value.split('.', 1)
+        value = _unquote(value)
+        if op == 'in':
+            value = [_unquote(item) for item in _split_top_level(value.strip('()'))]
+        predicates.append(lambda row, column=column, op=op, value=value, negate=negate:
+                          _compare(op, row.get(column), value) != negate)
+    return predicates
+
+def _parse_select(columns):
+    """List of (name, fk_column or None, nested spec) for a select string"""
+    spec = []
+    for item in _split_top_level(columns or '*'):
+        match = re.match(r'^(\w+)(?:!(\w+))?\((.*)\)$', item, re.DOTALL)
+        if match:
+            table, hint, nested = match.groups()
+            spec.append((table, hint or table.rstrip('s') + '_id', _parse_select(nested)))
+        else:
+            spec.append((item, None, None))
+    return spec
+
+class MemoryQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._operation = 'select'
+        self._columns = '*'
+        self._count = None
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+
+    # Operations
+    def select(self, columns='*', count=None, **kwargs):
+        self._operation, self._columns, self._count = 'select', columns, count
+        return self
+
+    def insert(self, payload, **kwargs):
+        self._operation, self._payload = 'insert', payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self._operation, self._payload = 'upsert', payload
+        return self
+
+    def update(self, payload, **kwargs):
+        self._operation, self._payload = 'update', payload
+        return self
+
+    def delete(self, **kwargs):
+        self._operation = 'delete'
+        return self
+
+    # Filters
+    def _filter(self, column, op, value):
+        self._filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, 'eq', value)
+
+    def neq(self, column, value):
+        return self._filter(column, 'neq', value)
+
+    def gt(self, column, value):
+        return self._filter(column, 'gt', value)
+
+    def gte(self, column, value):
+        return self._filter(column, 'gte', value)
+
+    def lt(self, column, value):
+        return self._filter(column, 'lt', value)
+
+    def lte(self, column, value):
+        return self._filter(column, 'lte', value)
+
+    def in_(self, column, values):
+        return self._filter(column, 'in', list(values))
+
+    def like(self, column, pattern):
+        return self._filter(column, 'like', pattern)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, 'ilike', pattern)
+
+    def is_(self, column, value):
+        return self._filter(column, 'is', value)
+
+    def filter(self, column, operator, criteria):
+        return self._filter(column, operator, criteria)
+
+    def or_(self, filters, **kwargs):
+        predicates = _parse_logic(filters)
+        self._filters.append((None, 'or', lambda row: any(predicate(row) for predicate in predicates)))
+        return self
+
+    # Modifiers
+    def order(self, column, desc=False, **kwargs):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size, **kwargs):
+        self._limit = size
+        return self
+
+    def range(self, start, end, **kwargs):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    # Execution
+    def _matches(self, table):
+        candidates = None
+        for column, op, value in self._filters:
+            if op == 'eq':
+                # Start from the smallest equality match available
+                if column == 'id':
+                    row = table.rows.get(_key(value))
+                    rows = [row] if row else []
+                else:
+                    rows = table.index(column).get(_key(value), [])
+                if candidates is None or len(rows) < len(candidates):
+                    candidates = rows
+        if candidates is None:
+            candidates = table.rows.values()
+        checks = []
+        for column, op, value in self._filters:
+            if op == 'or':
+                checks.append(value)
+            else:
+                checks.append(lambda row, column=column, op=op, value=value: _compare(op, row.get(column), value))
+        return [row for row in candidates if all(check(row) for check in checks)]
+
+    def _sorted(self, rows):
+        end = self._offset + self._limit if self._limit is not None else None
+        if not self._order:
+            return list(rows)[self._offset:end]
+
+        def sort_key(row):
+            # Postgres puts NULLs last ascending and first descending
+            return tuple((row.get(column) is None, row.get(column) if row.get(column) is not None else '')
+                         for column, desc in self._order)
+
+        directions = {desc for column, desc in self._order}
+        if end is not None and len(directions) == 1:
+            # Partial sort when only one page is wanted
+            pick = heapq.nlargest if directions.pop() else heapq.nsmallest
+            return pick(end, rows, key=sort_key)[self._offset:]
+        rows = list(rows)
+        for column, desc in reversed(self._order):
+            rows.sort(key=lambda row, column=column: (row.get(column) is None, row.get(column)
+                                                      if row.get(column) is not None else ''), reverse=desc)
+        return rows[self._offset:end]
+
+    def _project(self, row, spec):
+        result = {}
+        for name, fk, nested in spec:
+            if nested is None:
+                if name == '*':
+                    result.update(row)
+                else:
+                    result[name] = row.get(name)
+            else:
+                related = self._client._tables.get(name)
+                target = related.rows.get(_key(row.get(fk))) if related else None
+                result[name] = self._project(target, nested) if target else None
+        return result
+
+    def execute(self):
+        with self._client._lock:
+            table = self._client._table(self._table)
+            if self._operation == 'select':
+                rows = self._matches(table)
+                count = len(rows) if self._count else None
+                if self._columns.strip() == 'count':
+                    return MemoryResponse([{'count': len(rows)}], count=len(rows))
+                spec = _parse_select(self._columns)
+                return MemoryResponse([self._project(row, spec) for row in self._sorted(rows)], count=count)
+            if self._operation in ('insert', 'upsert'):
+                payload = self._payload if isinstance(self._payload, list) else [self._payload]
+                inserted = []
+                for data in payload:
+                    row = copy.deepcopy(data)
+                    row.setdefault('id', str(uuid.uuid4()))
+                    row['id'] = str(row['id'])
+                    if self._operation == 'upsert' and row['id'] in table.rows:
+                        table.rows[row['id']].update(row)
+                        row = table.rows[row['id']]
+                    else:
+                        row.setdefault('created_at', datetime.now().isoformat())
+                        table.rows[row['id']] = row
+                    inserted.append(dict(row))
+                table.changed()
+                return MemoryResponse(inserted)
+            rows = self._matches(table)
+            if self._operation == 'update':
+                for row in rows:
+                    row.update(copy.deepcopy(self._payload))
+                table.changed()
+                return MemoryResponse([dict(row) for row in rows])
+            if self._operation == 'delete':
+                for row in rows:
+                    del table.rows[row['id']]
+                table.changed()
+                return MemoryResponse([dict(row) for row in rows])
+        raise ValueError(f'Unsupported operation: {self._operation}')
+
+class AuthError(Exception):
+    pass
+
+class StorageError(Exception):
+    pass
+
+class _MemoryAdmin:
+    def __init__(self, auth):
+        self._auth = auth
+
+    def create_user(self, attributes):
+        return self._auth._create(attributes['email'], attributes.get('password'))
+
+    def update_user_by_id(self, user_id, attributes):
+        with self._auth._lock:
+            account = next((account for account in self._auth._accounts.values() if account['id'] == str(user_id)), None)
+            if account is None:
+                raise AuthError('User not found')
+            if 'email' in attributes:
+                del self._auth._accounts[account['email']]
+                account['email'] = attributes['email']
+                self._auth._accounts[account['email']] = account
+            if 'password' in attributes:
+                account['password'] = attributes['password']
+        return self._auth._response(account)
+
+class MemoryAuth:
+    """Email/password accounts; ids match the `users` rows created for them"""
+
+    def __init__(self):
+        self._accounts = {}  # email -> {'id', 'email', 'password'}
+        self._lock = threading.Lock()
+        self.admin = _MemoryAdmin(self)
+
+    @staticmethod
+    def _response(account):
+        user = SimpleNamespace(id=account['id'], email=account['email'])
+        return SimpleNamespace(user=user, session=None)
+
+    def _create(self, email, password, user_id=None):
+        with self._lock:
+            if email in self._accounts:
+                raise AuthError('User already registered')
+            account = {'id': str(user_id or uuid.uuid4()), 'email': email, 'password': password}
+            self._accounts[email] = account
+        return self._response(account)
+
+    def sign_up(self, credentials):
+        return self._create(credentials['email'], credentials['password'])
+
+    def sign_in_with_password(self, credentials):
+        with self._lock:
+            account = self._accounts.get(credentials['email'])
+        if account is None or account['password'] != credentials['password']:
+            raise AuthError('Invalid login credentials')
+        return self._response(account)
+
+    def sign_out(self):
+        pass
+
+class MemoryBucket:
+    def __init__(self, storage, name):
+        self._storage = storage
+        self._objects = storage._buckets.setdefault(name, {})
+        self.name = name
+
+    def upload(self, path, file, file_options=None):
+        data = file.read() if hasattr(file, 'read') else file
+        if isinstance(data, str):
+            with open(data, 'rb') as source:
+                data = source.read()
+        options = file_options or {}
+        with self._storage._lock:
+            if path in self._objects and str(options.get('upsert', options.get('x-upsert'))).lower() != 'true':
+                raise StorageError(f'The resource already exists: {path}')
+            self._objects[path] = (bytes(data), options.get('content-type', 'application/octet-stream'))
+        return SimpleNamespace(path=path, full_path=f'{self.name}/{path}')
+
+    def download(self, path):
+        with self._storage._lock:
+            if path not in self._objects:
+                raise StorageError(f'Object not found: {path}')
+            return self._objects[path][0]
+
+    def remove(self, paths):
+        with self._storage._lock:
+            return [{'name': path} for path in paths if self._objects.pop(path, None) is not None]
+
+    def get_public_url(self, path, options=None):
+        return f'{self._storage.public_url}/{self.name}/{path}'
+
+class MemoryStorage:
+    def __init__(self, public_url='/storage'):
+        self.public_url = public_url.rstrip('/')
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def from_(self, bucket):
+        return MemoryBucket(self, bucket)
+
+    def get(self, bucket, path):
+        """(bytes, content type) of a stored object, or None"""
+        with self._lock:
+            return self._buckets.get(bucket, {}).get(path)
+
+class MemoryClient:
+    def __init__(self, tables=None, storage_url='/storage'):
+        self._tables = {}
+        self._lock = threading.RLock()
+        self.auth = MemoryAuth()
+        self.storage = MemoryStorage(storage_url)
+        for name, rows in (tables or {}).items():
+            self.load(name, rows)
+
+    @classmethod
+    def from_seed(cls, path=None, storage_url='/storage'):
+        """A client loaded from a JSON seed file, or with just the default admin account.
+
+        The seed maps table names to lists of rows, plus an optional
+        "accounts" list of {"email", "password"} for users that can log in.
+        """
+        client = cls(storage_url=storage_url)
+        if path:
+            with open(path) as seed_file:
+                seed = json.load(seed_file)
+            accounts = seed.pop('accounts', [])
+            for name, rows in seed.items():
+                client.load(name, rows)
+        else:
+            admin = {'id': str(uuid.uuid4()), 'name': 'Administrator', 'email': 'admin@example.com', 'role': 'admin',
+                     'created_at': datetime.now().isoformat()}
+            client.load('users', [admin])
+            accounts = [{'email': admin['email'], 'password': 'admin123'}]
+        users = {row.get('email'): row['id'] for row in client._table('users').rows.values()}
+        for account in accounts:
+            client.auth._create(account['email'], account['password'], user_id=users.get(account['email']))
+        return client
+
+    def _table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = _Table(name)
+        return table
+
+    def load(self, name, rows):
+        """Bulk-load rows (dicts with an 'id') without going through insert"""
+        table = self._table(name)
+        for row in rows:
+            row['id'] = str(row['id'])
+            table.rows[row['id']] = row
+        table.changed()
+
+    def table(self, name):
+        return MemoryQuery(self, name)
+
+    from_ = table
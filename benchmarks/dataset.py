@@ -0,0 +1,125 @@
+"""Synthetic hospital data with roughly realistic shapes.
+
+A few patients account for most visits (Pareto-distributed), appointments
+fall on weekdays on a 15 minute grid, invoice amounts are log-normal and
+statuses depend on whether a date is past or future.
+"""
+import random
+import uuid
+from datetime import date, datetime, time, timedelta
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David',
+               'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah',
+               'Priya', 'Arjun', 'Wei', 'Mei', 'Carlos', 'Sofia', 'Ahmed', 'Fatima', 'Kenji', 'Yuki']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez',
+              'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Patel',
+              'Sharma', 'Kumar', 'Chen', 'Wang', 'Kim', 'Nguyen', 'Khan', 'Tanaka', 'Silva', 'Okafor']
+DEPARTMENTS = ['cardiology', 'neurology', 'orthopedics', 'pediatrics', 'general_medicine', 'gynecology',
+               'ophthalmology', 'dermatology', 'psychiatry', 'ent']
+# ABO/Rh frequencies, approximately
+BLOOD_GROUPS = (['O+', 'A+', 'B+', 'AB+', 'O-', 'A-', 'B-', 'AB-'], [37, 36, 9, 3, 7, 6, 1, 1])
+RECORD_TYPES = (['consultation', 'lab_test', 'prescription', 'imaging', 'surgery', 'discharge', 'other'],
+                [40, 25, 20, 8, 2, 3, 2])
+DIAGNOSES = ['Hypertension', 'Type 2 diabetes', 'Upper respiratory infection', 'Migraine', 'Lower back pain',
+             'Asthma', 'Anxiety disorder', 'Osteoarthritis', 'Gastroenteritis', 'Allergic rhinitis',
+             'Urinary tract infection', 'Atrial fibrillation', 'Hypothyroidism', 'Eczema', 'Fracture of radius']
+REASONS = ['Follow-up', 'Annual check-up', 'Consultation', 'Test results', 'Prescription renewal', 'New symptoms']
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def _skewed_index(rng, size, alpha=1.2):
+    """Index in [0, size) where low indexes are much more likely"""
+    return min(int(rng.paretovariate(alpha)) - 1, size - 1) if size > 1 else 0
+
+def _timestamp(rng, start, end):
+    return (start + timedelta(seconds=rng.randrange(int((end - start).total_seconds())))).isoformat()
+
+def _weekday(rng, start_day, days):
+    day = start_day + timedelta(days=rng.randrange(days))
+    # Push weekends to the following Monday
+    return day + timedelta(days=(7 - day.weekday()) % 7 if day.weekday() >= 5 else 0)
+
+def generate(patients=10000, appointments=50000, invoices=20000, records=30000, doctors=50, seed=42, today=None):
+    """Dict of table name -> list of rows, plus the id of an admin user to log in as"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    now = datetime.combine(today, time(12))
+    history_start = now - timedelta(days=3 * 365)
+
+    admin_id = _uuid(rng)
+    users = [{'id': admin_id, 'name': 'Benchmark Admin', 'email': 'admin@example.com', 'role': 'admin',
+              'department': None, 'created_at': history_start.isoformat()}]
+    for i in range(doctors):
+        users.append({
+            'id': _uuid(rng), 'name': f'Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'email': f'doctor{i}@example.com', 'phone': f'555{rng.randrange(10 ** 7):07d}', 'role': 'doctor',
+            'specialty': 'General', 'department': DEPARTMENTS[i % len(DEPARTMENTS)], 'working_hours': None,
+            'created_at': _timestamp(rng, history_start, now)
+        })
+    doctor_ids = [user['id'] for user in users[1:]]
+
+    patient_rows = []
+    for i in range(patients):
+        age_days = int(min(max(rng.gauss(42, 20), 0.1), 95) * 365.25)
+        patient_rows.append({
+            'id': _uuid(rng), 'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'email': f'patient{i}@example.com', 'phone': f'{rng.randrange(2, 10)}{rng.randrange(10 ** 9):09d}',
+            'date_of_birth': (today - timedelta(days=age_days)).isoformat(),
+            'gender': rng.choice(['male', 'female']),
+            'blood_group': rng.choices(*BLOOD_GROUPS)[0],
+            'address': f'{rng.randrange(1, 9999)} Main Street', 'medical_history': '',
+            'registered_by': admin_id, 'created_at': _timestamp(rng, history_start, now), 'updated_at': None
+        })
+    # Shuffle so that frequent visitors aren't also the oldest registrations
+    frequent = [row['id'] for row in patient_rows]
+    rng.shuffle(frequent)
+
+    appointment_rows = []
+    for i in range(appointments):
+        future = rng.random() < 0.15
+        day = _weekday(rng, today, 60) if future else _weekday(rng, today - timedelta(days=730), 730)
+        if future:
+            status = rng.choices(['scheduled', 'confirmed', 'cancelled'], [70, 25, 5])[0]
+        else:
+            status = rng.choices(['completed', 'cancelled', 'scheduled'], [80, 15, 5])[0]
+        slot = rng.randrange(32)
+        appointment_rows.append({
+            'id': _uuid(rng), 'patient_id': frequent[_skewed_index(rng, len(frequent))],
+            'doctor_id': doctor_ids[_skewed_index(rng, len(doctor_ids), alpha=2.0)],
+            'date': day.isoformat(), 'time': f'{9 + slot // 4:02d}:{slot % 4 * 15:02d}:00',
+            'duration': rng.choice([15, 30, 30, 30, 45, 60]), 'reason': rng.choice(REASONS), 'status': status,
+            'notes': '', 'created_by': admin_id, 'created_at': _timestamp(rng, history_start, now)
+        })
+
+    invoice_rows = []
+    for i in range(invoices):
+        invoice_day = today - timedelta(days=rng.randrange(730))
+        due_day = invoice_day + timedelta(days=30)
+        if rng.random() < 0.03:
+            status = 'cancelled'
+        elif rng.random() < 0.75:
+            status = 'paid'
+        else:
+            status = 'overdue' if due_day < today else 'pending'
+        invoice_rows.append({
+            'id': _uuid(rng), 'patient_id': frequent[_skewed_index(rng, len(frequent))],
+            'invoice_date': invoice_day.isoformat(), 'due_date': due_day.isoformat(),
+            'amount': round(rng.lognormvariate(5, 0.8), 2), 'status': status, 'notes': '',
+            'created_by': admin_id, 'created_at': invoice_day.isoformat() + 'T09:00:00',
+            'updated_at': invoice_day.isoformat() + 'T09:00:00'
+        })
+
+    record_rows = []
+    for i in range(records):
+        record_rows.append({
+            'id': _uuid(rng), 'patient_id': frequent[_skewed_index(rng, len(frequent))],
+            'doctor_id': rng.choice(doctor_ids), 'record_type': rng.choices(*RECORD_TYPES)[0],
+            'diagnosis': rng.choice(DIAGNOSES), 'treatment': 'Standard care', 'notes': '',
+            'record_date': (today - timedelta(days=rng.randrange(730))).isoformat(),
+            'attachment_url': None, 'created_by': admin_id, 'created_at': _timestamp(rng, history_start, now)
+        })
+
+    tables = {'users': users, 'patients': patient_rows, 'appointments': appointment_rows,
+              'invoices': invoice_rows, 'medical_records': record_rows}
+    return tables, admin_id
@@ -0,0 +1,175 @@
+"""Benchmark the main pages against synthetic data.
+
+Generates a dataset, serves it from the in-memory data backend and
+drives the real blueprints through the Flask test client, so the numbers
+measure app-side cost (query building, filtering, templates) without
+network latency.
+
+    python -m benchmarks.run --patients 100000 --appointments 500000 --requests 200
+    python -m benchmarks.run --json baseline.json
+    python -m benchmarks.run --compare baseline.json --threshold 0.2
+
+With --compare the run exits non-zero if any scenario's p95 is more than
+`threshold` slower than the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def build_app(tables):
+    """Import the app on the in-memory data backend, loaded with `tables`"""
+    os.environ['DATA_BACKEND'] = 'memory'
+    # Background jobs would skew timings
+    os.environ.setdefault('OVERDUE_SWEEP_INTERVAL', '0')
+    os.environ.setdefault('THUMBNAIL_WORKERS', '0')
+    os.environ.setdefault('STARTUP_REPORT', '0')
+    import logging
+    from extensions import supabase_client
+    for name, rows in tables.items():
+        supabase_client.load(name, rows)
+    from app import create_app
+    app = create_app()
+    # The per-request JSON log lines would dominate the output
+    logging.getLogger('hms.requests').disabled = True
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    return app
+
+def scenarios(tables, rng):
+    """(name, endpoint, url factory) for each page measured"""
+    patients = tables['patients']
+    doctors = [user for user in tables['users'] if user['role'] == 'doctor']
+    return [
+        ('dashboard.index', lambda: '/dashboard/'),
+        ('patients.list', lambda: '/patients/'),
+        ('patients.list?q=name', lambda: '/patients/?q=' + rng.choice(patients)['name'].split()[1][:4]),
+        ('patients.list?q=phone', lambda: '/patients/?q=' + rng.choice(patients)['phone'][:4]),
+        ('patients.lookup', lambda: '/patients/lookup?q=' + rng.choice(patients)['name'][:3]),
+        ('patients.view', lambda: '/patients/view/' + rng.choice(patients)['id']),
+        ('appointments.list', lambda: '/appointments/'),
+        ('appointments.list?doctor', lambda: '/appointments/?doctor_id=' + rng.choice(doctors)['id']),
+        ('billing.list', lambda: '/billing/'),
+        ('billing.reports', lambda: '/billing/reports'),
+        ('medical_records.list', lambda: '/medical-records/'),
+        ('medical_records.search', lambda: '/medical-records/search?q=' + rng.choice(['hypertension', 'asthma', 'fracture'])),
+    ]
+
+def _failed(response):
+    # Routes catch their own errors and flash them, so look at the page too
+    return response.status_code >= 400 or b'alert alert-danger' in response.data
+
+def run_scenario(client, url, requests, warmup):
+    for _ in range(warmup):
+        client.get(url())
+    samples, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        target = url()
+        began = time.perf_counter()
+        response = client.get(target)
+        samples.append(time.perf_counter() - began)
+        errors += _failed(response)
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': requests,
+        'errors': errors,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p95_ms': percentile(samples, 0.95) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+        'throughput_rps': requests / elapsed if elapsed else 0.0
+    }
+
+def peak_memory(client, url, requests):
+    """Peak bytes allocated by Python while serving a few requests"""
+    tracemalloc.start()
+    try:
+        for _ in range(requests):
+            client.get(url())
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--patients', type=int, default=10000)
+    parser.add_argument('--appointments', type=int, default=50000)
+    parser.add_argument('--invoices', type=int, default=20000)
+    parser.add_argument('--records', type=int, default=30000)
+    parser.add_argument('--doctors', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=100, help='timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed requests per scenario')
+    parser.add_argument('--memory-requests', type=int, default=5, help='requests traced for peak memory (0 skips)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', help='comma-separated scenario names to run')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--compare', help='baseline results file to compare p95 against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed p95 slowdown vs baseline (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    from benchmarks.dataset import generate
+    began = time.perf_counter()
+    tables, admin_id = generate(patients=args.patients, appointments=args.appointments, invoices=args.invoices,
+                                records=args.records, doctors=args.doctors, seed=args.seed)
+    print(f"Generated {', '.join(f'{len(rows)} {name}' for name, rows in tables.items())} "
+          f"in {time.perf_counter() - began:.1f}s", file=sys.stderr)
+
+    app = build_app(tables)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = admin_id
+        session['_fresh'] = True
+
+    rng = random.Random(args.seed)
+    only = set(args.only.split(',')) if args.only else None
+    results = {}
+    for name, url in scenarios(tables, rng):
+        if only and name not in only:
+            continue
+        result = run_scenario(client, url, args.requests, args.warmup)
+        if args.memory_requests:
+            result['peak_alloc_mb'] = peak_memory(client, url, args.memory_requests) / 2 ** 20
+        results[name] = result
+        print(f"{name:28} p50 {result['p50_ms']:8.2f}ms  p95 {result['p95_ms']:8.2f}ms  "
+              f"p99 {result['p99_ms']:8.2f}ms  {result['throughput_rps']:8.1f} req/s"
+              + (f"  peak {result['peak_alloc_mb']:7.1f}MB" if 'peak_alloc_mb' in result else '')
+              + (f"  {result['errors']} errors" if result['errors'] else ''))
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10)
+    print(f"Process peak RSS: {max_rss:.0f}MB")
+    report = {
+        'dataset': {name: len(rows) for name, rows in tables.items()},
+        'requests': args.requests,
+        'peak_rss_mb': max_rss,
+        'scenarios': results
+    }
+    if args.json:
+        with open(args.json, 'w') as output:
+            json.dump(report, output, indent=2)
+
+    status = 1 if any(result['errors'] for result in results.values()) else 0
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['scenarios']
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before and result['p95_ms'] > before['p95_ms'] * (1 + args.threshold):
+                print(f"REGRESSION {name}: p95 {before['p95_ms']:.2f}ms -> {result['p95_ms']:.2f}ms")
+                status = 1
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
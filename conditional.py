@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import threading
+from flask import current_app, make_response, render_template, request, session
+from flask_login import current_user
+
+# Pages show patient data: browsers may keep a copy but must check it is
+# still current before each use, and shared caches must not store it
+CACHE_CONTROL = 'private, no-cache'
+
+_templates_version = None
+_templates_lock = threading.Lock()
+
+def templates_version():
+    """Changes whenever a template file does, so a deploy invalidates every ETag"""
+    global _templates_version
+    if _templates_version is None:
+        with _templates_lock:
+            if _templates_version is None:
+                digest = hashlib.sha1()
+                for root, dirs, files in os.walk(os.path.join(current_app.root_path, current_app.template_folder)):
+                    dirs.sort()
+                    for name in sorted(files):
+                        path = os.path.join(root, name)
+                        digest.update(f'{path}:{os.stat(path).st_mtime_ns}'.encode())
+                _templates_version = digest.hexdigest()[:12]
+    return _templates_version
+
+def page_etag(template_name, context):
+    """Weak ETag for a page: a hash of the rows it shows and who is viewing it.
+
+    The rows come in as fetched (ids, `updated_at` and any embedded names),
+    so any change that would show up on the page changes the tag, including
+    writes that don't bump `updated_at`, such as cancelling an appointment.
+    """
+    digest = hashlib.sha1()
+    digest.update(f'{template_name}|{templates_version()}|'.encode())
+    if current_user.is_authenticated:
+        # The navigation bar shows the user's name and role-dependent links
+        digest.update(f'{current_user.get_id()}|{current_user.name}|{current_user.role}|'.encode())
+    digest.update(json.dumps(context, sort_keys=True, default=str).encode())
+    return digest.hexdigest()[:32]
+
+def conditional_render(template_name, **context):
+    """render_template that answers a matching If-None-Match with 304.
+
+    The data still has to be fetched to know whether it changed, but an
+    unchanged page skips rendering and is not sent again. A page with flash
+    messages waiting is always rendered, since showing them consumes them.
+    """
+    etag = page_etag(template_name, context)
+    if request.if_none_match.contains_weak(etag) and not session.get('_flashes'):
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(render_template(template_name, **context))
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
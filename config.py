@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -12,6 +13,78 @@ class Config:
     SUPABASE_KEY = os.environ.get('SUPABASE_KEY')
     SUPABASE_SERVICE_KEY = os.environ.get('SUPABASE_SERVICE_KEY')
     
+    # Data backend: 'supabase', or 'memory' for an in-process store (no credentials needed)
+    DATA_BACKEND = os.environ.get('DATA_BACKEND', 'supabase')
+    # Optional JSON file of rows to load into the memory backend
+    MEMORY_BACKEND_SEED = os.environ.get('MEMORY_BACKEND_SEED')
+    # Print how long building the app took when it starts
+    STARTUP_REPORT = os.environ.get('STARTUP_REPORT', '1') not in ('0', 'false', 'False')
+    
     # Upload settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload
+    
+    # Cache settings
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 300))  # seconds
+    DASHBOARD_STATS_TTL = int(os.environ.get('DASHBOARD_STATS_TTL', 30))  # seconds
+    DASHBOARD_STATS_STALE_TTL = int(os.environ.get('DASHBOARD_STATS_STALE_TTL', 300))  # seconds
+    
+    # Appointment list settings
+    APPOINTMENTS_WINDOW_DAYS = int(os.environ.get('APPOINTMENTS_WINDOW_DAYS', 7))  # days either side of today
+    REFERENCE_CACHE_TTL = int(os.environ.get('REFERENCE_CACHE_TTL', 300))  # seconds
+    PATIENT_INDEX_TTL = int(os.environ.get('PATIENT_INDEX_TTL', 600))  # seconds between full rebuilds
+    PATIENT_CHART_TTL = int(os.environ.get('PATIENT_CHART_TTL', 30))  # seconds
+    RECORD_SEARCH_TTL = int(os.environ.get('RECORD_SEARCH_TTL', 3600))  # seconds between full rebuilds
+    RECORD_SEARCH_SYNC = int(os.environ.get('RECORD_SEARCH_SYNC', 30))  # seconds between catch-ups on other workers' writes
+    FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', 16))  # threads running a page's independent queries
+    
+    # Appointment booking
+    APPOINTMENT_DURATION = int(os.environ.get('APPOINTMENT_DURATION', 30))  # default length in minutes
+    APPOINTMENT_OVERLAP = os.environ.get('APPOINTMENT_OVERLAP', 'reject')  # 'reject' or 'warn'
+    SCHEDULE_INDEX_TTL = int(os.environ.get('SCHEDULE_INDEX_TTL', 60))  # seconds a loaded day is trusted
+    APPOINTMENT_SLOT_MINUTES = int(os.environ.get('APPOINTMENT_SLOT_MINUTES', 15))  # booking grid
+    DEFAULT_WORKING_HOURS = os.environ.get('DEFAULT_WORKING_HOURS', 'mon-fri 09:00-17:00')  # doctors without their own
+    AVAILABILITY_DAYS = int(os.environ.get('AVAILABILITY_DAYS', 14))  # how far ahead to look for free slots
+    
+    # Attachment uploads are streamed to storage in chunks of this size
+    UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+    # Optional larger limit for imaging studies (requires Flask 3.1+), e.g. 512MB
+    IMAGING_MAX_CONTENT_LENGTH = int(os.environ.get('IMAGING_MAX_CONTENT_LENGTH', 0)) or None
+    # Worker processes generating attachment previews (0 disables them)
+    THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+    
+    # Rows per insert when bulk importing patients
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+    
+    # Billing reports are cached per date range for this long
+    REPORT_CACHE_TTL = int(os.environ.get('REPORT_CACHE_TTL', 300))  # seconds
+    
+    # Background job marking pending invoices past due as overdue
+    OVERDUE_SWEEP_INTERVAL = int(os.environ.get('OVERDUE_SWEEP_INTERVAL', 3600))  # seconds, 0 disables
+    OVERDUE_SWEEP_BATCH_SIZE = int(os.environ.get('OVERDUE_SWEEP_BATCH_SIZE', 500))
+    # Only the process holding this file's lock sweeps, so one worker per host does
+    OVERDUE_SWEEP_LOCK = os.environ.get('OVERDUE_SWEEP_LOCK') or os.path.join(tempfile.gettempdir(), 'hms-overdue-sweep.lock')
+    
+    # Invoice PDF rendering
+    PDF_CACHE_FOLDER = os.environ.get('PDF_CACHE_FOLDER') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_cache')
+    PDF_WORKERS = int(os.environ.get('PDF_WORKERS', 0))  # 0 uses one per CPU
+    PDF_RENDER_TIMEOUT = int(os.environ.get('PDF_RENDER_TIMEOUT', 60))  # seconds
+    
+    # Keep-alive HTTP connections shared by every thread talking to Supabase
+    HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 20))  # at least threads per worker
+    HTTP_POOL_KEEPALIVE = int(os.environ.get('HTTP_POOL_KEEPALIVE', 20))  # idle connections kept open
+    HTTP_POOL_KEEPALIVE_EXPIRY = float(os.environ.get('HTTP_POOL_KEEPALIVE_EXPIRY', 30))  # seconds
+    HTTP_TIMEOUT = float(os.environ.get('HTTP_TIMEOUT', 30))  # seconds
+    
+    # Bearer token required to scrape /metrics (unset limits it to logged-in admins)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # `flask serve` (gunicorn) settings
+    SERVE_BIND = os.environ.get('SERVE_BIND', '0.0.0.0:8000')
+    SERVE_WORKERS = int(os.environ.get('SERVE_WORKERS', 0))  # 0 uses 2 x CPUs + 1
+    SERVE_THREADS = int(os.environ.get('SERVE_THREADS', 4))  # request threads per worker
+    SERVE_TIMEOUT = int(os.environ.get('SERVE_TIMEOUT', 60))  # seconds
+    SERVE_GRACEFUL_TIMEOUT = int(os.environ.get('SERVE_GRACEFUL_TIMEOUT', 30))  # seconds
+    SERVE_MAX_REQUESTS = int(os.environ.get('SERVE_MAX_REQUESTS', 0))  # recycle workers after this many, 0 never
+    SERVE_WARM_UP = os.environ.get('SERVE_WARM_UP', '1') not in ('0', 'false', 'False')
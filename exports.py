@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, stream_with_context
+from extensions import supabase_client
+from pagination import fetch_page
+
+EXPORT_PAGE_SIZE = 1000
+
+# Output columns for each export: (header, column or embedded-resource path)
+EXPORTS = {
+    'invoices': {
+        'table': 'invoices',
+        'select': 'id, patient_id, invoice_date, due_date, amount, status, notes, created_at, updated_at, patients(name)',
+        'order': ['invoice_date', 'id'],
+        'date_column': 'invoice_date',
+        'fields': [
+            ('id', 'id'), ('patient_id', 'patient_id'), ('patient_name', 'patients.name'),
+            ('invoice_date', 'invoice_date'), ('due_date', 'due_date'), ('amount', 'amount'),
+            ('status', 'status'), ('notes', 'notes'), ('created_at', 'created_at'), ('updated_at', 'updated_at')
+        ]
+    },
+    'appointments': {
+        'table': 'appointments',
+        'select': 'id, patient_id, doctor_id, date, time, reason, status, notes, created_at, patients(name), users!doctor_id(name)',
+        'order': ['date', 'time', 'id'],
+        'date_column': 'date',
+        'fields': [
+            ('id', 'id'), ('patient_id', 'patient_id'), ('patient_name', 'patients.name'),
+            ('doctor_id', 'doctor_id'), ('doctor_name', 'users.name'), ('date', 'date'), ('time', 'time'),
+            ('reason', 'reason'), ('status', 'status'), ('notes', 'notes'), ('created_at', 'created_at')
+        ]
+    },
+    'medical_records': {
+        'table': 'medical_records',
+        'select': 'id, patient_id, doctor_id, record_date, record_type, diagnosis, treatment, notes, '
+                  'attachment_url, created_at, patients(name), users!doctor_id(name)',
+        'order': ['record_date', 'id'],
+        'date_column': 'record_date',
+        'fields': [
+            ('id', 'id'), ('patient_id', 'patient_id'), ('patient_name', 'patients.name'),
+            ('doctor_id', 'doctor_id'), ('doctor_name', 'users.name'), ('record_date', 'record_date'),
+            ('record_type', 'record_type'), ('diagnosis', 'diagnosis'), ('treatment', 'treatment'),
+            ('notes', 'notes'), ('attachment_url', 'attachment_url'), ('created_at', 'created_at')
+        ]
+    }
+}
+
+def _lookup(row, path):
+    value = row
+    for key in path.split('.'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+def iter_rows(name, filters, page_size=EXPORT_PAGE_SIZE):
+    """Yield every matching row, one keyset page at a time.
+
+    `filters` maps column names to equality values, plus optional
+    start_date/end_date bounds on the export's date column.
+    """
+    export = EXPORTS[name]
+    cursor = None
+    while True:
+        query = supabase_client.table(export['table']).select(export['select'])
+        for column, value in filters.items():
+            if not value:
+                continue
+            if column == 'start_date':
+                query = query.gte(export['date_column'], value)
+            elif column == 'end_date':
+                query = query.lte(export['date_column'], value)
+            else:
+                query = query.eq(column, value)
+        rows, cursor = fetch_page(query, export['order'], cursor=cursor, page_size=page_size)
+        yield from rows
+        if cursor is None:
+            return
+
+def _csv_lines(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, path in fields])
+    for row in rows:
+        writer.writerow([_lookup(row, path) for header, path in fields])
+        # Hand each line to the client as soon as it is written
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    # Header-only export
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps({header: _lookup(row, path) for header, path in fields}, default=str) + '\n'
+
+def export_response(name, fmt, filters):
+    """Stream an export as CSV or NDJSON without materialising the result set"""
+    fields = EXPORTS[name]['fields']
+    rows = iter_rows(name, filters)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    if fmt == 'ndjson':
+        body, mimetype, extension = _ndjson_lines(rows, fields), 'application/x-ndjson', 'ndjson'
+    else:
+        body, mimetype, extension = _csv_lines(rows, fields), 'text/csv', 'csv'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={name}-{stamp}.{extension}'}
+    )
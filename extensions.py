@@ -1,11 +1,55 @@
+import os
+import threading
 from flask_login import LoginManager
-import supabase
-from config import Config
+from backends import create_client, create_auth_client
+from instrumentation import InstrumentedClient
 
 # Initialize Flask-Login
 login_manager = LoginManager()
 
-supabase_client = supabase.create_client(
-    Config.SUPABASE_URL,
-    Config.SUPABASE_SERVICE_KEY  # Use service role instead of regular key
-)
\ No newline at end of file
+class LazyClient:
+    """Stands in for a client that is only built on first use.
+
+    Importing this module (as every blueprint, form and model does) stays
+    cheap: the SDK is imported and the client constructed the first time a
+    query, auth or storage call is made.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+        # A forked worker must not share the parent's connections
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self.reset)
+
+    def reset(self):
+        """Drop the client so the next use builds a new one"""
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+# Supabase or the in-memory backend, per DATA_BACKEND. Queries go through the
+# instrumentation wrapper so their latency is recorded
+supabase_client = InstrumentedClient(LazyClient(create_client))
+
+def user_auth():
+    """Auth client for signing a user in, up or out.
+
+    Kept apart from `supabase_client` so one request's sign-in can't change
+    the credentials other threads' queries are sent with.
+    """
+    return create_auth_client(supabase_client)
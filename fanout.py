@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from instrumentation import propagate
+
+# Shared by every route, so a burst of page loads can't start unbounded threads
+_executor = ThreadPoolExecutor(max_workers=Config.FANOUT_WORKERS, thread_name_prefix='fanout')
+
+def fetch_concurrently(**calls):
+    """Start each zero-argument call at once; returns name -> Future.
+
+    For a route's independent queries (the record being edited, the doctor
+    list, the patient): the page waits for the slowest one instead of the
+    sum of all of them. Calling `.result()` re-raises a call's exception, so
+    each route keeps its own error handling around each result.
+    """
+    return {name: _executor.submit(propagate(call)) for name, call in calls.items()}
@@ -0,0 +1,60 @@
+from flask import url_for
+from markupsafe import Markup, escape
+from wtforms import Field, ValidationError
+from patient_index import patient_index
+
+class PatientLookupWidget:
+    """Hidden patient id plus a search box wired to the typeahead endpoint"""
+
+    def __call__(self, field, **kwargs):
+        kwargs.setdefault('class', 'form-control')
+        label = ''
+        patient = field.patient
+        if patient:
+            label = patient['name']
+            if patient.get('phone'):
+                label += f" ({patient['phone']})"
+        return Markup(
+            f'<input type="hidden" id="{escape(field.id)}" name="{escape(field.name)}" value="{escape(field._value())}">'
+            f'<div class="position-relative">'
+            f'<input type="text" class="{escape(kwargs["class"])} patient-lookup" autocomplete="off" '
+            f'data-target="{escape(field.id)}" data-url="{escape(url_for("patients.lookup"))}" '
+            f'placeholder="Search by name, phone or date of birth" value="{escape(label)}">'
+            f'<div class="list-group position-absolute w-100 patient-lookup-results" style="z-index: 1000;"></div>'
+            f'</div>'
+        )
+
+class PatientField(Field):
+    """A single patient id, checked against the patient index on submit.
+
+    Replaces a SelectField holding every patient, so forms no longer ship
+    the whole roster as choices.
+    """
+    widget = PatientLookupWidget()
+
+    def __init__(self, label=None, validators=None, **kwargs):
+        super().__init__(label, validators, **kwargs)
+        self._patient = (None, None)
+
+    @property
+    def patient(self):
+        """The indexed patient row for the current id, or None"""
+        patient_id, patient = self._patient
+        if self.data and patient_id != self.data:
+            try:
+                patient = patient_index.get(self.data)
+            except Exception:
+                patient = None
+            self._patient = (self.data, patient)
+        return patient if self.data else None
+
+    def _value(self):
+        return str(self.data) if self.data else ''
+
+    def process_formdata(self, valuelist):
+        if valuelist:
+            self.data = valuelist[0].strip() or None
+
+    def pre_validate(self, form):
+        if self.data and self.patient is None:
+            raise ValidationError('Select a patient from the search results.')
@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from config import Config
+
+class _PoolStats:
+    """Connections checked out and how long requests queued for one"""
+
+    def __init__(self, size):
+        self.size = size
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.requests = 0
+        self.waited = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'requests': self.requests,
+                'waited': self.waited,
+                'wait_seconds': round(self.wait_seconds, 6),
+                'max_wait_seconds': round(self.max_wait_seconds, 6)
+            }
+
+def _transport_class():
+    import httpx
+
+    class _ReleasingStream(httpx.SyncByteStream):
+        """Response body that hands its connection back when closed"""
+
+        def __init__(self, stream, release):
+            self._stream = stream
+            self._release = release
+
+        def __iter__(self):
+            yield from self._stream
+
+        def close(self):
+            try:
+                self._stream.close()
+            finally:
+                self._release()
+
+    class PooledTransport(httpx.BaseTransport):
+        """HTTP transport that counts connections and time spent queuing for one.
+
+        A semaphore sized like the pool sits in front of it, so a request
+        that has to wait does so here, where the wait can be timed.
+        """
+
+        def __init__(self, stats, limits):
+            self.stats = stats
+            self._slots = threading.BoundedSemaphore(limits.max_connections)
+            self._transport = httpx.HTTPTransport(limits=limits, http2=False)
+
+        def handle_request(self, request):
+            began = time.perf_counter()
+            waited = not self._slots.acquire(blocking=False)
+            if waited:
+                self._slots.acquire()
+            wait = time.perf_counter() - began
+            with self.stats.lock:
+                self.stats.requests += 1
+                self.stats.in_use += 1
+                self.stats.peak_in_use = max(self.stats.peak_in_use, self.stats.in_use)
+                if waited:
+                    self.stats.waited += 1
+                    self.stats.wait_seconds += wait
+                    self.stats.max_wait_seconds = max(self.stats.max_wait_seconds, wait)
+
+            released = threading.Event()
+
+            def release():
+                if not released.is_set():
+                    released.set()
+                    with self.stats.lock:
+                        self.stats.in_use -= 1
+                    self._slots.release()
+
+            try:
+                response = self._transport.handle_request(request)
+            except BaseException:
+                release()
+                raise
+            response.stream = _ReleasingStream(response.stream, release)
+            return response
+
+        def close(self):
+            self._transport.close()
+
+    return PooledTransport
+
+class HTTPPool:
+    """One keep-alive HTTP client shared by every thread in the process.
+
+    The data client, per-user auth calls and attachment uploads all go
+    through it, so connections to the Supabase host are reused across
+    requests instead of each client keeping (and re-opening) its own. Built
+    on first use; a forked worker starts with a fresh one.
+    """
+
+    def __init__(self, size=20, keepalive=20, keepalive_expiry=30.0, timeout=30.0):
+        self.size = size
+        self.keepalive = keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._stats = _PoolStats(size)
+        self._client = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._client = None
+        self._lock = threading.Lock()
+        self._stats = _PoolStats(self.size)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    limits = httpx.Limits(max_connections=self.size, max_keepalive_connections=self.keepalive,
+                                          keepalive_expiry=self.keepalive_expiry)
+                    # Uploads are streamed, so writes may take as long as they need
+                    self._client = httpx.Client(transport=_transport_class()(self._stats, limits),
+                                                timeout=httpx.Timeout(self.timeout, write=None))
+        return self._client
+
+    @property
+    def loaded(self):
+        return self._client is not None
+
+    def stats(self):
+        return self._stats.snapshot()
+
+    def render(self):
+        """Pool gauges and counters in Prometheus text format"""
+        stats = self.stats()
+        return '\n'.join([
+            '# HELP hms_http_pool_size Connections the shared HTTP pool may open',
+            '# TYPE hms_http_pool_size gauge',
+            f"hms_http_pool_size {stats['size']}",
+            '# HELP hms_http_pool_in_use Connections currently serving a request',
+            '# TYPE hms_http_pool_in_use gauge',
+            f"hms_http_pool_in_use {stats['in_use']}",
+            '# HELP hms_http_pool_requests_total Requests sent through the shared HTTP pool',
+            '# TYPE hms_http_pool_requests_total counter',
+            f"hms_http_pool_requests_total {stats['requests']}",
+            '# HELP hms_http_pool_waits_total Requests that queued for a free connection',
+            '# TYPE hms_http_pool_waits_total counter',
+            f"hms_http_pool_waits_total {stats['waited']}",
+            '# HELP hms_http_pool_wait_seconds_total Time requests spent queuing for a connection',
+            '# TYPE hms_http_pool_wait_seconds_total counter',
+            f"hms_http_pool_wait_seconds_total {stats['wait_seconds']}"
+        ])
+
+http_pool = HTTPPool(size=Config.HTTP_POOL_SIZE, keepalive=Config.HTTP_POOL_KEEPALIVE,
+                     keepalive_expiry=Config.HTTP_POOL_KEEPALIVE_EXPIRY, timeout=Config.HTTP_TIMEOUT)
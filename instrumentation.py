@@ -0,0 +1,213 @@
+import contextvars
+import hmac
+import json
+import logging
+import threading
+import time
+from flask import Response, g, request
+from flask_login import current_user
+from config import Config
+from http_pool import http_pool
+
+logger = logging.getLogger('hms.requests')
+
+# Prometheus' default latency buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+WRITE_OPERATIONS = ('insert', 'update', 'upsert', 'delete')
+
+# Queries made while handling the current request
+_current_trace = contextvars.ContextVar('query_trace', default=None)
+
+class Histogram:
+    """Cumulative latency histogram per label set, in Prometheus' layout"""
+
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[0][i] += 1
+            series[1] += 1
+            series[2] += seconds
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, (bucket_counts, count, total) in series:
+            pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                lines.append(f'{self.name}_bucket{{{pairs},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{pairs},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{pairs}}} {total}')
+            lines.append(f'{self.name}_count{{{pairs}}} {count}')
+        return '\n'.join(lines)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+request_latency = Histogram('hms_request_duration_seconds', 'Time spent handling a request',
+                            ('endpoint', 'method', 'status'))
+query_latency = Histogram('hms_db_query_duration_seconds', 'Time spent waiting on a Supabase query',
+                          ('endpoint', 'table', 'operation'))
+
+class RequestTrace:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.queries = []  # (table, operation, rows, seconds)
+        self._lock = threading.Lock()
+
+    def record(self, table, operation, rows, seconds):
+        with self._lock:
+            self.queries.append((table, operation, rows, seconds))
+
+def _record_query(table, operation, rows, seconds):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.record(table, operation, rows, seconds)
+    query_latency.observe((trace.endpoint if trace else '<background>', table, operation), seconds)
+
+class _TracedQuery:
+    """Wraps a postgrest request builder so that `execute()` is timed"""
+
+    def __init__(self, builder, table, operation='select'):
+        self._builder = builder
+        self._table = table
+        self._operation = operation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._builder, name)
+        if name in ('select',) + WRITE_OPERATIONS:
+            operation = name
+        else:
+            operation = self._operation
+        if callable(attribute):
+            def traced(*args, **kwargs):
+                result = attribute(*args, **kwargs)
+                return _TracedQuery(result, self._table, operation) if hasattr(result, 'execute') else result
+            return traced
+        # Properties such as `not_` return the builder itself
+        return _TracedQuery(attribute, self._table, operation) if hasattr(attribute, 'execute') else attribute
+
+    def execute(self):
+        started = time.perf_counter()
+        rows = 0
+        try:
+            response = self._builder.execute()
+            data = getattr(response, 'data', None)
+            rows = len(data) if isinstance(data, list) else int(data is not None)
+            return response
+        finally:
+            _record_query(self._table, self._operation, rows, time.perf_counter() - started)
+
+class InstrumentedClient:
+    """Supabase client whose table and RPC queries report their latency.
+
+    Everything else (auth, storage, ...) is passed straight through.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _TracedQuery(self._client.table(name), name)
+
+    from_ = table
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        return _TracedQuery(self._client.rpc(fn, params or {}, *args, **kwargs), f'rpc:{fn}', 'rpc')
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+def propagate(fn):
+    """Bind `fn` to the current request's trace so queries it runs on a pool thread are counted.
+
+    Call it once per submitted task: a context can't be entered by two
+    threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+def _start_trace():
+    g.request_started = time.perf_counter()
+    g.query_trace = RequestTrace(request.endpoint or '<unmatched>')
+    g.query_trace_token = _current_trace.set(g.query_trace)
+
+def _finish_trace(response):
+    trace = g.pop('query_trace', None)
+    if trace is None:
+        return response
+    elapsed = time.perf_counter() - g.pop('request_started')
+    request_latency.observe((trace.endpoint, request.method, str(response.status_code)), elapsed)
+
+    db_seconds = sum(query[3] for query in trace.queries)
+    per_table = {}
+    for table, operation, rows, seconds in trace.queries:
+        key = f'{table}.{operation}'
+        count, total = per_table.get(key, (0, 0.0))
+        per_table[key] = (count + 1, total + seconds)
+    timings = [f'db;desc="{len(trace.queries)} queries";dur={db_seconds * 1000:.1f}',
+               # Fan-out queries overlap, so db time can exceed the request's wall time
+               f'app;dur={max(elapsed - db_seconds, 0) * 1000:.1f}',
+               f'total;dur={elapsed * 1000:.1f}']
+    response.headers['Server-Timing'] = ', '.join(timings)
+
+    logger.info(json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': trace.endpoint,
+        'status': response.status_code,
+        'duration_ms': round(elapsed * 1000, 1),
+        'db_ms': round(db_seconds * 1000, 1),
+        'queries': len(trace.queries),
+        'rows': sum(query[2] for query in trace.queries),
+        'tables': {key: {'count': count, 'ms': round(total * 1000, 1)} for key, (count, total) in per_table.items()}
+    }))
+    return response
+
+def _reset_trace(exception=None):
+    token = g.pop('query_trace_token', None)
+    if token is not None:
+        try:
+            _current_trace.reset(token)
+        except ValueError:
+            # Torn down in a different context than it was set in
+            _current_trace.set(None)
+
+def metrics():
+    # Scrapers present METRICS_TOKEN; without one configured, only admins may look
+    token = Config.METRICS_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    elif not current_user.is_authenticated:
+        return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    elif current_user.role != 'admin':
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    body = '\n'.join([request_latency.render(), query_latency.render(), http_pool.render()]) + '\n'
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+def init_app(app):
+    """Trace every request and serve the histograms on /metrics"""
+    if not logger.handlers:
+        # One JSON line per request on stderr
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    app.before_request(_start_trace)
+    app.after_request(_finish_trace)
+    app.teardown_request(_reset_trace)
+    app.add_url_rule('/metrics', 'metrics', metrics)
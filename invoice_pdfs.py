@@ -0,0 +1,135 @@
+import glob
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from flask import render_template
+from config import Config
+from extensions import supabase_client
+from pagination import fetch_page
+
+INVOICE_COLUMNS = '*, patients(name)'
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_pool = None
+_pool_lock = threading.Lock()
+# Cache path -> future, so concurrent requests for one invoice render it once
+_in_flight = {}
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # wkhtmltopdf runs as a subprocess, so threads are enough to use every core
+            _pool = ThreadPoolExecutor(max_workers=Config.PDF_WORKERS or os.cpu_count(),
+                                       thread_name_prefix='invoice-pdf')
+        return _pool
+
+def version_stamp(invoice):
+    """Microseconds since the epoch of the invoice's updated_at (or created_at); 0 if unknown"""
+    version = invoice.get('updated_at') or invoice.get('created_at')
+    try:
+        changed = version if isinstance(version, datetime) else datetime.fromisoformat(str(version))
+    except ValueError:
+        return 0
+    return (changed.astimezone(timezone.utc) - _EPOCH) // timedelta(microseconds=1)
+
+def cache_path(invoice):
+    """Cached PDF location; changes whenever the invoice's updated_at does"""
+    return os.path.join(Config.PDF_CACHE_FOLDER, f"{invoice['id']}-{version_stamp(invoice)}.pdf")
+
+def _render(html, path, invoice_id, stamp):
+    import pdfkit
+    pdf = pdfkit.from_string(html, False, options={'quiet': ''})
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    # Write then rename so readers never see a partial file. The temporary
+    # name is unique across every worker process, not just this one's threads.
+    handle, temporary = tempfile.mkstemp(dir=folder, prefix=f"{invoice_id}-", suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as output:
+            output.write(pdf)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    # Drop PDFs rendered for older versions of this invoice. A newer one may
+    # have just been written (or be being sent) by another worker, so keep it.
+    for stale in glob.glob(os.path.join(folder, f"{invoice_id}-*.pdf")):
+        try:
+            older = int(os.path.basename(stale)[len(invoice_id) + 1:-len('.pdf')]) < stamp
+        except ValueError:
+            older = True  # Named by an earlier version of this module
+        if older:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+def _submit(invoice):
+    """Queue a render unless one is cached or already running; returns a future or None"""
+    path = cache_path(invoice)
+    if os.path.exists(path):
+        return None
+    with _pool_lock:
+        future = _in_flight.get(path)
+        if future is not None:
+            return future
+    # Templates are rendered here, in the caller's app context
+    html = render_template('billing/invoice_pdf.html', invoice=invoice)
+    executor = _executor()
+    with _pool_lock:
+        future = _in_flight.get(path)
+        if future is not None:
+            return future
+        future = executor.submit(_render, html, path, invoice['id'], version_stamp(invoice))
+        _in_flight[path] = future
+    # Outside the lock: the callback runs immediately if the render already finished
+    future.add_done_callback(lambda done: _forget(path))
+    return future
+
+def _forget(path):
+    with _pool_lock:
+        _in_flight.pop(path, None)
+
+def invoice_pdf(invoice):
+    """Path of the invoice's PDF, rendering it on the worker pool if not cached"""
+    future = _submit(invoice)
+    if future is not None:
+        future.result(timeout=Config.PDF_RENDER_TIMEOUT)
+    return cache_path(invoice)
+
+def render_month(month):
+    """Render every invoice dated in `month` (YYYY-MM) in parallel.
+
+    Invoices are read a page at a time and each page is finished before the
+    next is fetched, so at most one page of HTML is held in memory.
+    """
+    year, month_number = (int(part) for part in month.split('-'))
+    start = date(year, month_number, 1)
+    end = date(year + month_number // 12, month_number % 12 + 1, 1)
+    result = {'invoices': 0, 'rendered': 0, 'cached': 0, 'failed': 0}
+    cursor = None
+    while True:
+        query = supabase_client.table('invoices').select(INVOICE_COLUMNS).gte(
+            'invoice_date', start.isoformat()).lt('invoice_date', end.isoformat())
+        invoices, cursor = fetch_page(query, ['invoice_date', 'id'], cursor=cursor, page_size=500)
+        futures = []
+        for invoice in invoices:
+            result['invoices'] += 1
+            future = _submit(invoice)
+            if future is None:
+                result['cached'] += 1
+            else:
+                futures.append(future)
+        for future in futures:
+            try:
+                future.result(timeout=Config.PDF_RENDER_TIMEOUT)
+                result['rendered'] += 1
+            except Exception as e:
+                print(f"Error rendering invoice PDF: {e}")
+                result['failed'] += 1
+        if cursor is None:
+            return result
@@ -1,5 +1,10 @@
 from flask_login import UserMixin
 from extensions import supabase_client
+from cache import TTLCache
+from config import Config
+
+# Process-local cache of users table rows, keyed by user id
+user_cache = TTLCache(maxsize=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
 
 class User(UserMixin):
     def __init__(self, id, email, name, role, is_active=True):
@@ -30,10 +35,15 @@ class User(UserMixin):
     @staticmethod
     def get_by_id(user_id):
         try:
-            # Get user from Supabase
-            response = supabase_client.table('users').select('*').eq('id', user_id).execute()
-            if response.data:
-                user_data = response.data[0]
+            # Serve from cache when possible
+            user_data = user_cache.get(str(user_id))
+            if user_data is None:
+                # Get user from Supabase
+                response = supabase_client.table('users').select('id, email, name, role').eq('id', user_id).execute()
+                if response.data:
+                    user_data = response.data[0]
+                    user_cache.set(str(user_id), user_data)
+            if user_data:
                 return User(
                     id=user_data['id'],
                     email=user_data['email'],
@@ -44,6 +54,15 @@ class User(UserMixin):
             print(f"Error fetching user: {e}")
         return None
     
+    @staticmethod
+    def invalidate(user_id):
+        """Drop a cached user row after it has been changed"""
+        user_cache.invalidate(str(user_id))
+    
+    @staticmethod
+    def cache_stats():
+        return user_cache.stats()
+    
     def debug_info(self):
         """Print debug information about user attributes"""
         print(f"User debug info:")
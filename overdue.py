@@ -0,0 +1,88 @@
+import threading
+from datetime import date, datetime
+from config import Config
+from extensions import supabase_client
+
+try:
+    import fcntl
+except ImportError:  # Windows: no other workers to coordinate with
+    fcntl = None
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_sweep_lock_file = None
+
+def sweep_overdue_invoices(batch_size=None, today=None):
+    """Mark pending invoices past their due date as overdue.
+
+    Ids are fetched a batch at a time and each batch is moved with a single
+    update. Updated rows stop matching the pending filter, so every pass
+    reads the first page again until none are left.
+    """
+    batch_size = batch_size or Config.OVERDUE_SWEEP_BATCH_SIZE
+    today = (today or date.today()).isoformat()
+    result = {'batches': 0, 'updated': 0}
+    while True:
+        response = supabase_client.table('invoices').select('id').eq('status', 'pending').lt(
+            'due_date', today).order('due_date').limit(batch_size).execute()
+        ids = [row['id'] for row in (response.data or [])]
+        if not ids:
+            return result
+        updated = supabase_client.table('invoices').update({
+            'status': 'overdue',
+            'updated_at': datetime.now().isoformat()
+        }).in_('id', ids).eq('status', 'pending').execute()
+        result['batches'] += 1
+        result['updated'] += len(updated.data or [])
+        # Stop on the last page, or if nothing changed so we don't spin on the same rows
+        if len(ids) < batch_size or not updated.data:
+            return result
+
+def _claim_sweep():
+    """Whether this process sweeps: the first to lock OVERDUE_SWEEP_LOCK keeps it until it exits"""
+    global _sweep_lock_file
+    if _sweep_lock_file is not None or fcntl is None:
+        return True
+    handle = open(Config.OVERDUE_SWEEP_LOCK, 'a')
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return False
+    _sweep_lock_file = handle
+    return True
+
+def _run_scheduled(interval):
+    try:
+        if not _claim_sweep():
+            return
+        result = sweep_overdue_invoices()
+        if result['updated']:
+            print(f"Overdue sweep marked {result['updated']} invoices overdue in {result['batches']} batches")
+    except Exception as e:
+        print(f"Error sweeping overdue invoices: {e}")
+    finally:
+        with _scheduler_lock:
+            _schedule(interval)
+
+def _schedule(interval):
+    # Callers hold _scheduler_lock
+    global _scheduler
+    _scheduler = threading.Timer(interval, _run_scheduled, args=(interval,))
+    _scheduler.daemon = True
+    _scheduler.start()
+
+def start_overdue_scheduler(interval=None):
+    """Run the sweep every `interval` seconds in a background thread (0 disables it).
+
+    Called by the long-running servers (each `flask serve` worker, `python
+    app.py`), not by the app factory, so CLI commands and tests don't start a
+    timer. Every worker ticks, but only the one holding OVERDUE_SWEEP_LOCK
+    sweeps. Never call this in a process that forks workers afterwards.
+    """
+    interval = Config.OVERDUE_SWEEP_INTERVAL if interval is None else interval
+    if not interval:
+        return
+    with _scheduler_lock:
+        if _scheduler is None:
+            _schedule(interval)
@@ -0,0 +1,70 @@
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(row, columns):
+    """Build an opaque cursor from the sort-key columns of the last row on a page"""
+    payload = json.dumps([row.get(column) for column in columns], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, columns):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(columns) or None in values:
+        return None
+    return values
+
+def _quote(value):
+    # PostgREST logic trees need reserved characters quoted
+    return '"' + str(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+def keyset_filter(columns, values, desc=False):
+    """PostgREST `or` expression selecting rows strictly after `values` in sort order.
+
+    For columns (a, b, c) ascending this is
+    a > A or (a = A and b > B) or (a = A and b = B and c > C).
+    """
+    op = 'lt' if desc else 'gt'
+    branches = []
+    for i, column in enumerate(columns):
+        conditions = [f"{columns[j]}.eq.{_quote(values[j])}" for j in range(i)]
+        conditions.append(f"{column}.{op}.{_quote(values[i])}")
+        if len(conditions) == 1:
+            branches.append(conditions[0])
+        else:
+            branches.append(f"and({','.join(conditions)})")
+    return ','.join(branches)
+
+def page_size_arg(value, default=DEFAULT_PAGE_SIZE):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def fetch_page(query, columns, cursor=None, page_size=DEFAULT_PAGE_SIZE, desc=False):
+    """Run a keyset-paginated query and return (rows, next_cursor).
+
+    `query` is a select builder with all other filters applied. It is ordered
+    on `columns` here, and one extra row is fetched to know whether another
+    page exists.
+    """
+    values = decode_cursor(cursor, columns)
+    if values is not None:
+        query = query.or_(keyset_filter(columns, values, desc=desc))
+    for column in columns:
+        query = query.order(column, desc=desc)
+    response = query.limit(page_size + 1).execute()
+    rows = response.data if response.data else []
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1], columns)
+    return rows, next_cursor
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from cache import TTLCache
+from config import Config
+from extensions import supabase_client
+from instrumentation import propagate
+from schema import appointment_duration
+
+# Rows shown in each section of the chart
+CHART_LIMIT = 10
+
+def _patient(patient_id, today):
+    response = supabase_client.table('patients').select('*').eq('id', patient_id).execute()
+    return response.data[0] if response.data else None
+
+def _upcoming_appointments(patient_id, today):
+    return appointment_duration.run(lambda: supabase_client.table('appointments').select(
+        appointment_duration.select('id, date, time, reason, status, users!doctor_id(name)')
+    ).eq('patient_id', patient_id).gte('date', today).order('date').order('time').limit(CHART_LIMIT).execute()).data or []
+
+def _past_appointments(patient_id, today):
+    return appointment_duration.run(lambda: supabase_client.table('appointments').select(
+        appointment_duration.select('id, date, time, reason, status, users!doctor_id(name)')
+    ).eq('patient_id', patient_id).lt('date', today).order('date', desc=True).order(
+        'time', desc=True).limit(CHART_LIMIT).execute()).data or []
+
+def _records(patient_id, today):
+    return supabase_client.table('medical_records').select(
+        'id, record_date, record_type, diagnosis, users!doctor_id(name)'
+    ).eq('patient_id', patient_id).order('record_date', desc=True).limit(CHART_LIMIT).execute().data or []
+
+def _invoices(patient_id, today):
+    return supabase_client.table('invoices').select(
+        'id, invoice_date, due_date, amount, status'
+    ).eq('patient_id', patient_id).order('invoice_date', desc=True).limit(CHART_LIMIT).execute().data or []
+
+SECTIONS = {
+    'patient': _patient,
+    'upcoming_appointments': _upcoming_appointments,
+    'past_appointments': _past_appointments,
+    'records': _records,
+    'invoices': _invoices
+}
+
+class PatientChart:
+    """Everything on a patient's chart, fetched concurrently and cached briefly.
+
+    All sections are queried at once, so a cold chart costs about one round
+    trip. Routes that change a patient's data call `invalidate(patient_id)`;
+    the TTL covers writes made elsewhere (other processes, background jobs).
+    """
+
+    def __init__(self, ttl=30, maxsize=256, max_workers=10):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='patient-chart')
+
+    def get(self, patient_id):
+        """The chart for a patient, or None if there is no such patient"""
+        patient_id = str(patient_id)
+        chart = self._cache.get(patient_id)
+        if chart is not None:
+            return chart
+        today = date.today().isoformat()
+        futures = {name: self._executor.submit(propagate(fetch), patient_id, today) for name, fetch in SECTIONS.items()}
+        chart = {name: future.result() for name, future in futures.items()}
+        if chart['patient'] is None:
+            return None
+        self._cache.set(patient_id, chart)
+        return chart
+
+    def invalidate(self, patient_id):
+        if patient_id:
+            self._cache.invalidate(str(patient_id))
+
+    def stats(self):
+        return self._cache.stats()
+
+patient_chart = PatientChart(ttl=Config.PATIENT_CHART_TTL)
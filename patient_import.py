@@ -0,0 +1,84 @@
+import csv
+from werkzeug.datastructures import MultiDict
+from config import Config
+from extensions import supabase_client
+
+# Cap on per-row errors kept in memory for the report
+MAX_REPORTED_ERRORS = 1000
+# Form fields that are required, or select fields with no blank choice
+REQUIRED_COLUMNS = ('name', 'phone', 'date_of_birth', 'gender', 'blood_group')
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+def _validate_row(form_class, row):
+    """Check a CSV row with the same rules as the patient form; returns (data, errors)"""
+    form = form_class(formdata=MultiDict({key: (value or '').strip() for key, value in row.items() if key}),
+                       meta={'csrf': False})
+    if not form.validate():
+        errors = '; '.join(f"{field}: {', '.join(messages)}" for field, messages in form.errors.items())
+        return None, errors
+    return {
+        'name': form.name.data,
+        'email': form.email.data,
+        'phone': form.phone.data,
+        'date_of_birth': form.date_of_birth.data.isoformat(),
+        'gender': form.gender.data,
+        'blood_group': form.blood_group.data,
+        'address': form.address.data,
+        'medical_history': form.medical_history.data
+    }, None
+
+def _insert_batch(batch, result):
+    try:
+        supabase_client.table('patients').insert([data for line, data in batch]).execute()
+        result.inserted += len(batch)
+    except Exception:
+        # Retry row by row so the failing rows can be reported
+        for line, data in batch:
+            try:
+                supabase_client.table('patients').insert(data).execute()
+                result.inserted += 1
+            except Exception as e:
+                result.add_error(line, str(e))
+
+def import_patients(stream, registered_by=None, batch_size=None):
+    """Validate and insert patients from a CSV text stream in batches.
+
+    Rows are read one at a time, so memory use depends on the batch size and
+    not on the size of the file. The header row must name the patient form
+    fields and include at least REQUIRED_COLUMNS.
+    """
+    # routes.patients imports this module, so the form is imported here
+    from routes.patients import PatientForm
+    batch_size = batch_size or Config.IMPORT_BATCH_SIZE
+    result = ImportResult()
+    reader = csv.DictReader(stream)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+
+    batch = []
+    for row in reader:
+        result.rows += 1
+        data, errors = _validate_row(PatientForm, row)
+        if errors:
+            result.add_error(reader.line_num, errors)
+            continue
+        data['registered_by'] = registered_by
+        batch.append((reader.line_num, data))
+        if len(batch) >= batch_size:
+            _insert_batch(batch, result)
+            batch = []
+    if batch:
+        _insert_batch(batch, result)
+    return result
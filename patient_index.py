@@ -0,0 +1,276 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date
+from itertools import islice
+from config import Config
+from extensions import supabase_client
+
+INDEX_COLUMNS = 'id, name, phone, date_of_birth'
+LOAD_PAGE_SIZE = 1000
+# Upper bound on rows examined for a single very short query
+MAX_CANDIDATES = 5000
+
+DATE_QUERY = re.compile(r'^\d{4}(-\d{0,2}){0,2}$')
+PHONE_QUERY = re.compile(r'^[\d\s()+-]+$')
+
+def _digits(value):
+    return re.sub(r'\D', '', value or '')
+
+def _plausible_year(text):
+    return len(text) == 4 and text.isdigit() and 1900 <= int(text) <= date.today().year
+
+def _is_date_query(q):
+    # A bare year may also be the start of a phone number, so it only counts
+    # as a date once it has a '-' (the index tries it as a year after phones)
+    return '-' in q and DATE_QUERY.match(q) is not None and _plausible_year(q[:4])
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def _prefix_range(keys, prefix):
+    # keys is a sorted list of (key, id) tuples
+    start = bisect_left(keys, (prefix,))
+    for i in range(start, min(len(keys), start + MAX_CANDIDATES)):
+        key, patient_id = keys[i]
+        if not key.startswith(prefix):
+            break
+        yield patient_id
+
+def _search_database(q, limit):
+    """Name or phone prefix match straight from the patients table"""
+    q = re.sub(r'[%_*,()]', '', q.strip())
+    if not q or _is_date_query(q):
+        return []
+    if PHONE_QUERY.match(q) and len(_digits(q)) >= 3:
+        # Phones are stored as entered, e.g. "(555) 123-4567": match the
+        # digits in order, skipping any formatting around them
+        pattern = '^' + ''.join(rf'\D*{digit}' for digit in _digits(q))
+        query = supabase_client.table('patients').select(INDEX_COLUMNS).filter('phone', 'match', pattern)
+    else:
+        query = supabase_client.table('patients').select(INDEX_COLUMNS).ilike('name', f'{q}%')
+    return query.order('name').limit(limit).execute().data or []
+
+def _load_all_patients():
+    rows = []
+    start = 0
+    while True:
+        response = supabase_client.table('patients').select(INDEX_COLUMNS).order('id').range(
+            start, start + LOAD_PAGE_SIZE - 1).execute()
+        page = response.data or []
+        rows.extend(page)
+        if len(page) < LOAD_PAGE_SIZE:
+            return rows
+        start += LOAD_PAGE_SIZE
+
+class _Index:
+    """The actual lookup structures; rebuilt wholesale and swapped in on refresh."""
+
+    def __init__(self):
+        self.rows = {}
+        self.names = {}
+        self.name_tokens = []
+        self.phones = []
+        self.dobs = []
+        self.trigrams = {}
+
+    def _keys(self, row):
+        name = (row.get('name') or '').lower()
+        return (
+            name,
+            [(token, row['id']) for token in set(name.split())],
+            (_digits(row.get('phone')), row['id']),
+            (row.get('date_of_birth') or '', row['id'])
+        )
+
+    def add(self, row, bulk=False):
+        row = {key: row.get(key) for key in ('id', 'name', 'phone', 'date_of_birth')}
+        name, tokens, phone, dob = self._keys(row)
+        self.rows[row['id']] = row
+        self.names[row['id']] = name
+        if bulk:
+            # Sorted once at the end of a bulk build
+            self.name_tokens.extend(tokens)
+            self.phones.append(phone)
+            self.dobs.append(dob)
+        else:
+            for token in tokens:
+                insort(self.name_tokens, token)
+            insort(self.phones, phone)
+            insort(self.dobs, dob)
+        for gram in _trigrams(name):
+            self.trigrams.setdefault(gram, set()).add(row['id'])
+
+    def remove(self, patient_id):
+        row = self.rows.pop(patient_id, None)
+        if row is None:
+            return
+        name, tokens, phone, dob = self._keys(row)
+        del self.names[patient_id]
+        for keys, key in [(self.name_tokens, token) for token in tokens] + [(self.phones, phone), (self.dobs, dob)]:
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+        for gram in _trigrams(name):
+            ids = self.trigrams.get(gram)
+            if ids:
+                ids.discard(patient_id)
+
+    def finish_bulk(self):
+        self.name_tokens.sort()
+        self.phones.sort()
+        self.dobs.sort()
+
+    def _match_word(self, word):
+        matches = set(_prefix_range(self.name_tokens, word))
+        if len(word) >= 3:
+            # Substring matches anywhere in the name via trigram intersection
+            postings = sorted((self.trigrams.get(gram, set()) for gram in _trigrams(word)), key=len)
+            if postings and postings[0]:
+                candidates = set.intersection(*postings)
+                matches.update(pid for pid in candidates if word in self.names[pid])
+        return matches
+
+    def search(self, q, limit):
+        q = q.strip().lower()
+        if _is_date_query(q):
+            ids = _prefix_range(self.dobs, q)
+        elif PHONE_QUERY.match(q) and len(_digits(q)) >= 3:
+            ids = list(islice(_prefix_range(self.phones, _digits(q)), limit))
+            if not ids and _plausible_year(q):
+                # No phone starts with it, so take it as a birth year
+                ids = _prefix_range(self.dobs, q)
+        else:
+            words = q.split()
+            if not words:
+                return []
+            ids = self._match_word(words[0])
+            for word in words[1:]:
+                ids &= self._match_word(word)
+            # Names starting with the query first, then alphabetical
+            ranked = heapq.nsmallest(limit, ids, key=lambda pid: (not self.names[pid].startswith(q), self.names[pid]))
+            return [self.rows[pid] for pid in ranked]
+        results = []
+        for pid in ids:
+            results.append(self.rows[pid])
+            if len(results) >= limit:
+                break
+        return results
+
+class PatientIndex:
+    """In-memory typeahead index over patient name, phone and date of birth.
+
+    Built from the patients table on first use and rebuilt in the background
+    once older than `ttl`; patients.add/edit keep it current in between.
+    Each process has its own index, so a patient added through another
+    worker is only indexed here at the next rebuild; until then a search
+    with no match falls back to a prefix query on the table.
+    """
+
+    def __init__(self, loader=_load_all_patients, ttl=600):
+        self.loader = loader
+        self.ttl = ttl
+        self._index = None
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        # Reentrant: first use holds it while calling _build, which takes it too
+        self._build_lock = threading.RLock()
+        self._refreshing = False
+        # Writes made while a rebuild is loading, replayed onto the new index
+        self._pending = None
+
+    def _build(self):
+        with self._build_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                index = _Index()
+                for row in self.loader():
+                    index.add(row, bulk=True)
+                index.finish_bulk()
+                with self._lock:
+                    for row in self._pending:
+                        index.remove(row['id'])
+                        index.add(row)
+                    self._index = index
+                    self._built_at = time.monotonic()
+                return index
+            finally:
+                with self._lock:
+                    self._pending = None
+
+    def _background_refresh(self):
+        try:
+            self._build()
+        except Exception as e:
+            print(f"Error rebuilding patient index: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _current(self):
+        with self._lock:
+            index = self._index
+            if index is not None:
+                if time.monotonic() - self._built_at >= self.ttl and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                return index
+        # First use: build once while other requests wait
+        with self._build_lock:
+            with self._lock:
+                if self._index is not None:
+                    return self._index
+            return self._build()
+
+    def search(self, q, limit=10):
+        index = self._current()
+        with self._lock:
+            results = index.search(q, limit)
+        if results:
+            return results
+        # Possibly added through another worker since the last rebuild
+        results = _search_database(q, limit)
+        for row in results:
+            self.upsert(row)
+        return results
+
+    def get(self, patient_id):
+        """Return the indexed row for an id, checking the database on a miss"""
+        index = self._current()
+        with self._lock:
+            row = index.rows.get(patient_id)
+        if row is not None:
+            return row
+        response = supabase_client.table('patients').select(INDEX_COLUMNS).eq('id', patient_id).execute()
+        if response.data:
+            self.upsert(response.data[0])
+            return response.data[0]
+        return None
+
+    def upsert(self, row):
+        with self._lock:
+            if not row or 'id' not in row:
+                return
+            if self._pending is not None:
+                self._pending.append(row)
+            if self._index is None:
+                return
+            self._index.remove(row['id'])
+            self._index.add(row)
+
+    def invalidate(self):
+        with self._lock:
+            self._index = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._index.rows) if self._index is not None else 0,
+                'age': round(time.monotonic() - self._built_at, 1) if self._index is not None else None,
+                'ttl': self.ttl
+            }
+
+patient_index = PatientIndex(ttl=Config.PATIENT_INDEX_TTL)
@@ -0,0 +1,228 @@
+import heapq
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from config import Config
+from extensions import supabase_client
+
+INDEXED_FIELDS = ('diagnosis', 'treatment', 'notes')
+LOAD_PAGE_SIZE = 1000
+# Overlap between catch-up windows, for clock skew and slow commits
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'the', 'to', 'was', 'were', 'with'
+}
+
+def tokenize(text):
+    return [token for token in re.findall(r'[a-z0-9]+', (text or '').lower())
+            if len(token) > 1 and token not in STOPWORDS]
+
+def _document_terms(record):
+    return Counter(token for field in INDEXED_FIELDS for token in tokenize(record.get(field)))
+
+def _load_changed_records(since):
+    """Records created or edited at or after `since` (an ISO timestamp)"""
+    columns = 'id, ' + ', '.join(INDEXED_FIELDS)
+    return supabase_client.table('medical_records').select(columns).or_(
+        f'created_at.gte.{since},updated_at.gte.{since}').execute().data or []
+
+def _load_all_records():
+    columns = 'id, ' + ', '.join(INDEXED_FIELDS)
+    start = 0
+    while True:
+        response = supabase_client.table('medical_records').select(columns).order('id').range(
+            start, start + LOAD_PAGE_SIZE - 1).execute()
+        page = response.data or []
+        yield from page
+        if len(page) < LOAD_PAGE_SIZE:
+            return
+        start += LOAD_PAGE_SIZE
+
+class _InvertedIndex:
+    def __init__(self):
+        # term -> {record_id: term frequency}
+        self.postings = {}
+        # record_id -> (document length, terms)
+        self.documents = {}
+        self.total_length = 0
+
+    def add(self, record_id, terms):
+        self.remove(record_id)
+        length = sum(terms.values())
+        self.documents[record_id] = (length, tuple(terms))
+        self.total_length += length
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[record_id] = frequency
+
+    def remove(self, record_id):
+        document = self.documents.pop(record_id, None)
+        if document is None:
+            return
+        length, terms = document
+        self.total_length -= length
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(record_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def search(self, terms, limit):
+        """Return (total matches, [(record_id, score)]) for the top `limit` BM25 hits"""
+        count = len(self.documents)
+        if not count or not terms:
+            return 0, []
+        average_length = self.total_length / count
+        scores = {}
+        for term in set(terms):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for record_id, frequency in posting.items():
+                length = self.documents[record_id][0]
+                norm = frequency + K1 * (1 - B + B * length / average_length)
+                scores[record_id] = scores.get(record_id, 0.0) + idf * frequency * (K1 + 1) / norm
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return len(scores), top
+
+class RecordSearchIndex:
+    """Ranked full-text search over medical record diagnosis, treatment and notes.
+
+    Built from the table on first use and rebuilt in the background once older
+    than `ttl`; medical_records.add/edit/delete update it incrementally.
+    Records added or edited through other workers are picked up by a
+    catch-up query at most every `sync_interval` seconds. Records deleted
+    elsewhere stay indexed until the next rebuild, but search results are
+    re-read from the table, so they are never shown.
+    """
+
+    def __init__(self, loader=_load_all_records, ttl=3600, sync_interval=30, changes=_load_changed_records):
+        self.loader = loader
+        self.changes = changes
+        self.ttl = ttl
+        self.sync_interval = sync_interval
+        self._index = None
+        self._built_at = 0.0
+        self._synced_at = 0.0
+        self._synced_from = None
+        self._lock = threading.Lock()
+        # Reentrant: first use holds it while calling _build, which takes it too
+        self._build_lock = threading.RLock()
+        self._refreshing = False
+        self._syncing = False
+        # Writes made while a rebuild is loading, replayed onto the new index
+        self._pending = None
+
+    def _build(self):
+        with self._build_lock:
+            with self._lock:
+                self._pending = []
+            try:
+                synced_from = (datetime.now(timezone.utc) - SYNC_OVERLAP).isoformat()
+                index = _InvertedIndex()
+                for record in self.loader():
+                    index.add(record['id'], _document_terms(record))
+                with self._lock:
+                    for record_id, terms in self._pending:
+                        if terms is None:
+                            index.remove(record_id)
+                        else:
+                            index.add(record_id, terms)
+                    self._index = index
+                    self._built_at = self._synced_at = time.monotonic()
+                    self._synced_from = synced_from
+                return index
+            finally:
+                with self._lock:
+                    self._pending = None
+
+    def _background_refresh(self):
+        try:
+            self._build()
+        except Exception as e:
+            print(f"Error rebuilding medical record search index: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _background_sync(self, since):
+        try:
+            synced_from = (datetime.now(timezone.utc) - SYNC_OVERLAP).isoformat()
+            for record in self.changes(since):
+                self.upsert(record)
+            with self._lock:
+                self._synced_from = synced_from
+        except Exception as e:
+            print(f"Error catching up medical record search index: {e}")
+        finally:
+            with self._lock:
+                self._syncing = False
+
+    def _current(self):
+        with self._lock:
+            index = self._index
+            if index is not None:
+                now = time.monotonic()
+                if now - self._built_at >= self.ttl and not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                elif (now - self._synced_at >= self.sync_interval and not self._syncing
+                      and not self._refreshing):
+                    self._syncing = True
+                    self._synced_at = now
+                    threading.Thread(target=self._background_sync, args=(self._synced_from,), daemon=True).start()
+                return index
+        # First use: build once while other requests wait
+        with self._build_lock:
+            with self._lock:
+                if self._index is not None:
+                    return self._index
+            return self._build()
+
+    def search(self, q, page=1, per_page=20):
+        """Return (total matches, [(record_id, score)]) for one page of results"""
+        index = self._current()
+        page = max(page, 1)
+        with self._lock:
+            total, top = index.search(tokenize(q), page * per_page)
+        return total, top[(page - 1) * per_page:]
+
+    def upsert(self, record):
+        if not record or 'id' not in record:
+            return
+        terms = _document_terms(record)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((record['id'], terms))
+            if self._index is not None:
+                self._index.add(record['id'], terms)
+
+    def remove(self, record_id):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((record_id, None))
+            if self._index is not None:
+                self._index.remove(record_id)
+
+    def stats(self):
+        with self._lock:
+            if self._index is None:
+                return {'documents': 0, 'terms': 0, 'ttl': self.ttl}
+            return {
+                'documents': len(self._index.documents),
+                'terms': len(self._index.postings),
+                'age': round(time.monotonic() - self._built_at, 1),
+                'ttl': self.ttl
+            }
+
+record_search = RecordSearchIndex(ttl=Config.RECORD_SEARCH_TTL, sync_interval=Config.RECORD_SEARCH_SYNC)
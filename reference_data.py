@@ -0,0 +1,73 @@
+import threading
+import time
+from config import Config
+from extensions import supabase_client
+from schema import doctor_working_hours
+
+class ReferenceData:
+    """A small lookup list (e.g. doctor choices) kept in memory between requests.
+
+    Writers call `invalidate()`, which bumps the version so the next reader
+    reloads. The TTL bounds staleness for changes made by other processes.
+    """
+
+    def __init__(self, name, loader, ttl=300):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._value = None
+        self._loaded_version = -1
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if (self._value is not None and self._loaded_version == self.version
+                    and time.monotonic() - self._loaded_at < self.ttl):
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            version = self.version
+
+        value = self.loader()
+        with self._lock:
+            # Don't store a result that an invalidation raced past
+            if version == self.version:
+                self._value = value
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._value = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'size': len(self._value) if self._value is not None else 0,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+def _load_doctors():
+    response = supabase_client.table('users').select('id, name').eq('role', 'doctor').order('name').execute()
+    return [(doc['id'], doc['name']) for doc in (response.data or [])]
+
+def _load_doctor_hours():
+    # Doctors without working_hours (or before the column exists) get DEFAULT_WORKING_HOURS
+    response = doctor_working_hours.run(lambda: supabase_client.table('users').select(
+        doctor_working_hours.select('id, name, department')).eq('role', 'doctor').order('name').execute())
+    return response.data or []
+
+doctor_choices = ReferenceData('doctors', _load_doctors, ttl=Config.REFERENCE_CACHE_TTL)
+doctor_hours = ReferenceData('doctor_hours', _load_doctor_hours, ttl=Config.REFERENCE_CACHE_TTL)
+
+def cache_stats():
+    return {ref.name: ref.stats() for ref in (doctor_choices, doctor_hours)}
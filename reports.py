@@ -0,0 +1,106 @@
+from datetime import date
+import numpy as np
+from cache import TTLCache
+from config import Config
+from extensions import supabase_client
+from pagination import fetch_page
+
+REPORT_PAGE_SIZE = 1000
+STATUSES = ['pending', 'paid', 'overdue', 'cancelled']
+# Days past due: current, 1-30, 31-60, 61-90, over 90
+AGING_EDGES = np.array([1, 31, 61, 91])
+AGING_LABELS = ['Current', '1-30 days', '31-60 days', '61-90 days', 'Over 90 days']
+
+_report_cache = TTLCache(maxsize=64, ttl=Config.REPORT_CACHE_TTL)
+
+def _load_invoice_arrays(start_date, end_date):
+    """Page through invoices in the range into columnar NumPy arrays"""
+    invoice_dates, due_dates, amounts, statuses = [], [], [], []
+    cursor = None
+    while True:
+        query = supabase_client.table('invoices').select('id, invoice_date, due_date, amount, status')
+        if start_date:
+            query = query.gte('invoice_date', start_date)
+        if end_date:
+            query = query.lte('invoice_date', end_date)
+        rows, cursor = fetch_page(query, ['invoice_date', 'id'], cursor=cursor, page_size=REPORT_PAGE_SIZE)
+        if rows:
+            invoice_dates.append(np.array([row['invoice_date'] for row in rows], dtype='datetime64[D]'))
+            due_dates.append(np.array([row['due_date'] for row in rows], dtype='datetime64[D]'))
+            amounts.append(np.array([float(row['amount'] or 0) for row in rows], dtype=np.float64))
+            statuses.append(np.array([STATUSES.index(row['status']) if row['status'] in STATUSES else -1
+                                      for row in rows], dtype=np.int8))
+        if cursor is None:
+            break
+    if not invoice_dates:
+        return (np.array([], dtype='datetime64[D]'), np.array([], dtype='datetime64[D]'),
+                np.array([], dtype=np.float64), np.array([], dtype=np.int8))
+    return (np.concatenate(invoice_dates), np.concatenate(due_dates),
+            np.concatenate(amounts), np.concatenate(statuses))
+
+def compute_report(invoice_dates, due_dates, amounts, statuses, as_of):
+    """Revenue by month, status totals and receivables aging, all vectorized"""
+    paid = statuses == STATUSES.index('paid')
+    billable = statuses != STATUSES.index('cancelled')
+
+    # Revenue by month: billed (excluding cancelled) and collected
+    months = invoice_dates.astype('datetime64[M]')
+    revenue = []
+    if len(months):
+        first = months.min()
+        offsets = (months - first).astype(np.int64)
+        size = int(offsets.max()) + 1
+        billed = np.bincount(offsets, weights=np.where(billable, amounts, 0.0), minlength=size)
+        collected = np.bincount(offsets, weights=np.where(paid, amounts, 0.0), minlength=size)
+        counts = np.bincount(offsets, minlength=size)
+        for i in np.flatnonzero(counts):
+            revenue.append({
+                'month': str(first + i),
+                'invoices': int(counts[i]),
+                'billed': round(float(billed[i]), 2),
+                'collected': round(float(collected[i]), 2)
+            })
+
+    # Count and amount per status
+    known = statuses >= 0
+    status_counts = np.bincount(statuses[known], minlength=len(STATUSES))
+    status_amounts = np.bincount(statuses[known], weights=amounts[known], minlength=len(STATUSES))
+    status_totals = [
+        {'status': status, 'count': int(status_counts[i]), 'amount': round(float(status_amounts[i]), 2)}
+        for i, status in enumerate(STATUSES)
+    ]
+
+    # Aging of outstanding receivables by days past due
+    outstanding = np.isin(statuses, [STATUSES.index('pending'), STATUSES.index('overdue')])
+    days_past_due = (np.datetime64(as_of, 'D') - due_dates[outstanding]).astype(np.int64)
+    buckets = np.digitize(days_past_due, AGING_EDGES)
+    aging_counts = np.bincount(buckets, minlength=len(AGING_LABELS))
+    aging_amounts = np.bincount(buckets, weights=amounts[outstanding], minlength=len(AGING_LABELS))
+    aging = [
+        {'bucket': label, 'count': int(aging_counts[i]), 'amount': round(float(aging_amounts[i]), 2)}
+        for i, label in enumerate(AGING_LABELS)
+    ]
+
+    total_billed = float(amounts[billable].sum())
+    total_collected = float(amounts[paid].sum())
+    return {
+        'as_of': as_of.isoformat(),
+        'invoice_count': int(len(amounts)),
+        'total_billed': round(total_billed, 2),
+        'total_collected': round(total_collected, 2),
+        'total_outstanding': round(float(amounts[outstanding].sum()), 2),
+        'collection_rate': round(total_collected / total_billed, 4) if total_billed else 0.0,
+        'revenue_by_month': revenue,
+        'status_totals': status_totals,
+        'aging': aging
+    }
+
+def billing_report(start_date='', end_date=''):
+    """Billing report for invoices dated within the range, cached per range and day"""
+    as_of = date.today()
+    key = (start_date, end_date, as_of)
+    report = _report_cache.get(key)
+    if report is None:
+        report = compute_report(*_load_invoice_arrays(start_date, end_date), as_of=as_of)
+        _report_cache.set(key, report)
+    return report
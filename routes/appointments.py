@@ -1,18 +1,41 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
-from wtforms import StringField, DateField, TimeField, SelectField, TextAreaField, HiddenField, SubmitField
-from wtforms.validators import DataRequired, Optional
-from datetime import datetime, time
+from wtforms import StringField, DateField, TimeField, IntegerField, SelectField, TextAreaField, HiddenField, SubmitField
+from wtforms.validators import DataRequired, NumberRange, Optional
+from datetime import datetime, time, date, timedelta
+from config import Config
 from extensions import supabase_client
+from conditional import conditional_render
+from fanout import fetch_concurrently
+from patient_chart import patient_chart
+from pagination import fetch_page, page_size_arg
+from reference_data import doctor_choices
+from exports import export_response
+from scheduling import schedule_index, BLOCKING_STATUSES
+from schema import appointment_duration
+from availability import next_free_slots
+from routes.doctors import DEPARTMENTS
 
 appointments_bp = Blueprint('appointments', __name__, url_prefix='/appointments')
 
+# Columns shown on the list page plus the keyset sort columns
+LIST_COLUMNS = 'id, date, time, reason, status, patients(name), users!doctor_id(name)'
+LIST_ORDER = ['date', 'time', 'id']
+
+def parse_date_arg(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
 class AppointmentForm(FlaskForm):
     patient_id = HiddenField('Patient ID')
     doctor_id = SelectField('Doctor', validators=[DataRequired()], coerce=str)
     date = DateField('Date', validators=[DataRequired()])
     time = TimeField('Time', format='%H:%M', validators=[DataRequired()])
+    duration = IntegerField('Duration (minutes)', validators=[DataRequired(), NumberRange(min=5, max=480)],
+                            default=Config.APPOINTMENT_DURATION)
     reason = StringField('Reason for Visit', validators=[DataRequired()])
     status = SelectField('Status', choices=[
         ('scheduled', 'Scheduled'),
@@ -23,17 +46,91 @@ class AppointmentForm(FlaskForm):
     notes = TextAreaField('Notes', validators=[Optional()])
     submit = SubmitField('Save Appointment')
 
+def check_overlap(form, exclude=None):
+    """Whether the booking on `form` may be saved; overlaps are rejected or warned about per config"""
+    if form.status.data not in BLOCKING_STATUSES:
+        return True
+    # Rejecting must see bookings made by other workers, so read the day from the database
+    conflicts = schedule_index.conflicts(form.doctor_id.data, form.date.data.isoformat(), form.time.data,
+                                         form.duration.data, exclude=exclude,
+                                         fresh=Config.APPOINTMENT_OVERLAP != 'warn')
+    if not conflicts:
+        return True
+    message = f'The doctor already has {len(conflicts)} appointment(s) overlapping this time.'
+    if Config.APPOINTMENT_OVERLAP == 'warn':
+        flash(message, 'warning')
+        return True
+    form.time.errors.append(message)
+    flash(message, 'danger')
+    return False
+
 @appointments_bp.route('/')
 @login_required
 def list():
+    # Default to a window around today instead of the whole history
+    window = timedelta(days=Config.APPOINTMENTS_WINDOW_DAYS)
+    single_date = parse_date_arg(request.args.get('date'))
+    start_date = single_date or parse_date_arg(request.args.get('start_date')) or date.today() - window
+    end_date = single_date or parse_date_arg(request.args.get('end_date')) or date.today() + window
+    filters = {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'doctor_id': request.args.get('doctor_id', ''),
+        'status': request.args.get('status', '')
+    }
+    cursor = request.args.get('cursor', '')
+    page_size = page_size_arg(request.args.get('per_page'))
+    
+    doctors = []
+    try:
+        doctors = doctor_choices.get()
+    except Exception as e:
+        flash(f'Error fetching doctors: {str(e)}', 'danger')
+    
     try:
-        # Get all appointments with patient and doctor information
-        response = supabase_client.table('appointments').select('*, patients(name), users!doctor_id(name)').execute()
-        appointments = response.data if response.data else []
-        return render_template('appointments/list.html', appointments=appointments)
+        # Get one page of appointments in the window with patient and doctor information
+        query = supabase_client.table('appointments').select(LIST_COLUMNS)
+        query = query.gte('date', filters['start_date']).lte('date', filters['end_date'])
+        if filters['doctor_id']:
+            query = query.eq('doctor_id', filters['doctor_id'])
+        if filters['status']:
+            query = query.eq('status', filters['status'])
+        appointments, next_cursor = fetch_page(query, LIST_ORDER, cursor=cursor, page_size=page_size)
+        return conditional_render('appointments/list.html', appointments=appointments, doctors=doctors,
+                                  filters=filters, cursor=cursor, next_cursor=next_cursor, per_page=page_size)
     except Exception as e:
         flash(f'Error fetching appointments: {str(e)}', 'danger')
-        return render_template('appointments/list.html', appointments=[])
+        return render_template('appointments/list.html', appointments=[], doctors=doctors,
+                               filters=filters, cursor=cursor, next_cursor=None, per_page=page_size)
+
+@appointments_bp.route('/export')
+@login_required
+def export():
+    filters = {
+        'status': request.args.get('status', ''),
+        'doctor_id': request.args.get('doctor_id', ''),
+        'start_date': request.args.get('start_date', ''),
+        'end_date': request.args.get('end_date', '')
+    }
+    return export_response('appointments', request.args.get('format', 'csv'), filters)
+
+@appointments_bp.route('/availability')
+@login_required
+def availability():
+    # Next free slots for the schedule form, across a department or for one doctor
+    try:
+        count = min(int(request.args.get('count', 5)), 50)
+        duration = int(request.args.get('duration') or Config.APPOINTMENT_DURATION)
+    except ValueError:
+        return jsonify({'results': [], 'error': 'count and duration must be numbers'}), 400
+    start_date = max(parse_date_arg(request.args.get('date')) or date.today(), date.today())
+    try:
+        slots = next_free_slots(department=request.args.get('department') or None,
+                                doctor_id=request.args.get('doctor_id') or None,
+                                start_date=start_date, count=count, duration=duration)
+        return jsonify({'results': slots})
+    except Exception as e:
+        return jsonify({'results': [], 'error': str(e)}), 500
 
 @appointments_bp.route('/schedule', methods=['GET', 'POST'])
 @login_required
@@ -42,9 +139,7 @@ def schedule():
     
     # Populate the doctor dropdown
     try:
-        doctors_response = supabase_client.table('users').select('id, name').eq('role', 'doctor').execute()
-        doctors = doctors_response.data if doctors_response.data else []
-        form.doctor_id.choices = [(doc['id'], doc['name']) for doc in doctors]
+        form.doctor_id.choices = doctor_choices.get()
     except Exception as e:
         flash(f'Error fetching doctors: {str(e)}', 'danger')
         form.doctor_id.choices = []
@@ -65,20 +160,32 @@ def schedule():
                 'doctor_id': form.doctor_id.data,
                 'date': appointment_date,
                 'time': appointment_time,
+                'duration': form.duration.data,
                 'reason': form.reason.data,
                 'status': form.status.data,
                 'notes': form.notes.data,
                 'created_by': current_user.get_id()
             }
             
-            response = supabase_client.table('appointments').insert(appointment_data).execute()
-            flash('Appointment scheduled successfully!', 'success')
+            # Hold the doctor's day so two bookings in this process can't both pass
+            # the check; across workers the appointments_no_overlap constraint decides
+            with schedule_index.lock(form.doctor_id.data, appointment_date):
+                booked = check_overlap(form)
+                if booked:
+                    response = appointment_duration.run(lambda: supabase_client.table('appointments').insert(
+                        appointment_duration.payload(appointment_data)).execute())
+                    if response.data:
+                        schedule_index.add(response.data[0])
             
-            # If this was scheduled from a patient profile, return there
-            if form.patient_id.data:
-                return redirect(url_for('patients.view', id=form.patient_id.data))
-            else:
-                return redirect(url_for('appointments.list'))
+            if booked:
+                patient_chart.invalidate(form.patient_id.data)
+                flash('Appointment scheduled successfully!', 'success')
+                
+                # If this was scheduled from a patient profile, return there
+                if form.patient_id.data:
+                    return redirect(url_for('patients.view', id=form.patient_id.data))
+                else:
+                    return redirect(url_for('appointments.list'))
                 
         except Exception as e:
             flash(f'Error scheduling appointment: {str(e)}', 'danger')
@@ -93,7 +200,7 @@ def schedule():
         except Exception as e:
             flash(f'Error fetching patient details: {str(e)}', 'warning')
     
-    return render_template('appointments/schedule.html', form=form, patient=patient)
+    return render_template('appointments/schedule.html', form=form, patient=patient, departments=DEPARTMENTS)
 
 @appointments_bp.route('/view/<id>')
 @login_required
@@ -106,7 +213,7 @@ def view(id):
         
         if response.data:
             appointment = response.data[0]
-            return render_template('appointments/view.html', appointment=appointment)
+            return conditional_render('appointments/view.html', appointment=appointment)
         else:
             flash('Appointment not found.', 'warning')
             return redirect(url_for('appointments.list'))
@@ -118,19 +225,22 @@ def view(id):
 @login_required
 def edit(id):
     try:
-        # Get appointment details
-        response = supabase_client.table('appointments').select('*').eq('id', id).execute()
+        # Get appointment details (with its patient) and the doctor dropdown at once
+        futures = fetch_concurrently(
+            appointment=lambda: supabase_client.table('appointments').select('*, patients(*)').eq('id', id).execute(),
+            doctors=doctor_choices.get
+        )
+        response = futures['appointment'].result()
         if not response.data:
             flash('Appointment not found.', 'warning')
             return redirect(url_for('appointments.list'))
         
         appointment = response.data[0]
+        booked_patient = appointment.pop('patients', None)
         form = AppointmentForm()
         
         # Populate the doctor dropdown
-        doctors_response = supabase_client.table('users').select('id, name').eq('role', 'doctor').execute()
-        doctors = doctors_response.data if doctors_response.data else []
-        form.doctor_id.choices = [(doc['id'], doc['name']) for doc in doctors]
+        form.doctor_id.choices = futures['doctors'].result()
         
         if request.method == 'GET':
             # Populate form with appointment data
@@ -146,6 +256,7 @@ def edit(id):
                 # Fall back to no-seconds format if the first attempt fails
                 form.time.data = datetime.strptime(appointment['time'], '%H:%M').time()
                 
+            form.duration.data = appointment.get('duration') or Config.APPOINTMENT_DURATION
             form.reason.data = appointment['reason']
             form.status.data = appointment['status']
             form.notes.data = appointment['notes']
@@ -161,21 +272,36 @@ def edit(id):
                     'doctor_id': form.doctor_id.data,
                     'date': appointment_date,
                     'time': appointment_time,
+                    'duration': form.duration.data,
                     'reason': form.reason.data,
                     'status': form.status.data,
                     'notes': form.notes.data,
                     'updated_at': datetime.now().isoformat()
                 }
                 
-                supabase_client.table('appointments').update(appointment_data).eq('id', id).execute()
-                flash('Appointment updated successfully!', 'success')
-                return redirect(url_for('appointments.view', id=id))
+                with schedule_index.lock(form.doctor_id.data, appointment_date):
+                    booked = check_overlap(form, exclude=id)
+                    if booked:
+                        response = appointment_duration.run(lambda: supabase_client.table('appointments').update(
+                            appointment_duration.payload(appointment_data)).eq('id', id).execute())
+                        # The appointment may have moved to another doctor or day
+                        schedule_index.remove(appointment)
+                        if response.data:
+                            schedule_index.add(response.data[0])
+                
+                if booked:
+                    patient_chart.invalidate(appointment['patient_id'])
+                    flash('Appointment updated successfully!', 'success')
+                    return redirect(url_for('appointments.view', id=id))
             except Exception as e:
                 flash(f'Error updating appointment: {str(e)}', 'danger')
         
         # Get patient details for display in the form
         patient = None
-        if form.patient_id.data:
+        # The submitted id is a string; the row's may not be
+        if str(form.patient_id.data) == str(appointment['patient_id']):
+            patient = booked_patient
+        elif form.patient_id.data:
             patient_response = supabase_client.table('patients').select('*').eq('id', form.patient_id.data).execute()
             if patient_response.data:
                 patient = patient_response.data[0]
@@ -190,7 +316,11 @@ def edit(id):
 def cancel(id):
     try:
         # Update appointment status to cancelled
-        supabase_client.table('appointments').update({'status': 'cancelled'}).eq('id', id).execute()
+        response = supabase_client.table('appointments').update({'status': 'cancelled'}).eq('id', id).execute()
+        # Free the slot in the schedule index
+        for appointment in response.data or []:
+            schedule_index.remove(appointment)
+            patient_chart.invalidate(appointment['patient_id'])
         flash('Appointment cancelled successfully!', 'success')
         return redirect(url_for('appointments.view', id=id))
     except Exception as e:
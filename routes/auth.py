@@ -3,7 +3,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Email, EqualTo
 from flask_login import login_user, logout_user, current_user
-from extensions import supabase_client
+from extensions import supabase_client, user_auth
 from models import User  # Import from models instead of app
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -35,7 +35,7 @@ def login():
     if form.validate_on_submit():
         try:
             # Authenticate with Supabase
-            response = supabase_client.auth.sign_in_with_password({
+            response = user_auth().sign_in_with_password({
                 'email': form.email.data,
                 'password': form.password.data
             })
@@ -87,7 +87,7 @@ def register():
                 return render_template('auth/register.html', form=form)
             
             # Register with Supabase Auth
-            auth_response = supabase_client.auth.sign_up({
+            auth_response = user_auth().sign_up({
                 'email': form.email.data,
                 'password': form.password.data
             })
@@ -115,10 +115,8 @@ def register():
 
 @auth_bp.route('/logout')
 def logout():
+    # Sign-ins use a throwaway auth client, so there is no server-side
+    # Supabase session to end here
     logout_user()
-    try:
-        supabase_client.auth.sign_out()
-    except:
-        pass
     flash('You have been logged out.', 'info')
     return redirect(url_for('auth.login'))
\ No newline at end of file
@@ -1,15 +1,22 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, DateField, TextAreaField, SelectField, DecimalField, SubmitField
 from wtforms.validators import DataRequired, Optional, NumberRange
 from extensions import supabase_client
+from conditional import conditional_render
+from patient_chart import patient_chart
+from fields import PatientField
+from exports import export_response
+from overdue import sweep_overdue_invoices
+from invoice_pdfs import invoice_pdf, render_month, INVOICE_COLUMNS
+import click
 from datetime import datetime, timedelta
 
 billing_bp = Blueprint('billing', __name__, url_prefix='/billing')
 
 class InvoiceForm(FlaskForm):
-    patient_id = SelectField('Patient', validators=[DataRequired()], coerce=str)
+    patient_id = PatientField('Patient', validators=[DataRequired()])
     invoice_date = DateField('Invoice Date', validators=[DataRequired()], format='%Y-%m-%d')
     due_date = DateField('Due Date', validators=[DataRequired()], format='%Y-%m-%d')
     amount = DecimalField('Amount ($)', validators=[DataRequired(), NumberRange(min=0.01)], places=2)
@@ -30,6 +37,7 @@ def list():
         status = request.args.get('status', '')
         start_date = request.args.get('start_date', '')
         end_date = request.args.get('end_date', '')
+        filters = {'status': status, 'start_date': start_date, 'end_date': end_date}
         
         # Base query
         query = supabase_client.table('invoices').select('*, patients(name)')
@@ -46,10 +54,42 @@ def list():
         response = query.order('invoice_date', desc=True).execute()
         
         invoices = response.data if response.data else []
-        return render_template('billing/list.html', invoices=invoices)
+        return conditional_render('billing/list.html', invoices=invoices, filters=filters)
     except Exception as e:
         flash(f'Error fetching invoices: {str(e)}', 'danger')
-        return render_template('billing/list.html', invoices=[])
+        return render_template('billing/list.html', invoices=[], filters={})
+
+@billing_bp.route('/export')
+@login_required
+def export():
+    # Same filters as the invoice list
+    filters = {
+        'status': request.args.get('status', ''),
+        'start_date': request.args.get('start_date', ''),
+        'end_date': request.args.get('end_date', '')
+    }
+    return export_response('invoices', request.args.get('format', 'csv'), filters)
+
+@billing_bp.route('/reports')
+@login_required
+def reports():
+    start_date = request.args.get('start_date', '')
+    end_date = request.args.get('end_date', '')
+    try:
+        # NumPy is only loaded once someone asks for a report
+        from reports import billing_report
+        report = billing_report(start_date, end_date)
+    except Exception as e:
+        flash(f'Error building billing report: {str(e)}', 'danger')
+        report = None
+    return render_template('billing/reports.html', report=report, start_date=start_date, end_date=end_date)
+
+@billing_bp.cli.command('sweep-overdue')
+@click.option('--batch-size', type=int, default=None, help='Invoices per update (defaults to OVERDUE_SWEEP_BATCH_SIZE).')
+def sweep_overdue_command(batch_size):
+    """Mark pending invoices past their due date as overdue."""
+    result = sweep_overdue_invoices(batch_size=batch_size)
+    click.echo(f"Marked {result['updated']} invoices overdue in {result['batches']} batches.")
 
 @billing_bp.route('/create', methods=['GET', 'POST'])
 @login_required
@@ -61,15 +101,6 @@ def create():
         form.invoice_date.data = datetime.now().date()
         form.due_date.data = (datetime.now() + timedelta(days=30)).date()
     
-    # Populate patient dropdown
-    try:
-        patients_response = supabase_client.table('patients').select('id, name').order('name').execute()
-        patients = patients_response.data if patients_response.data else []
-        form.patient_id.choices = [(pat['id'], pat['name']) for pat in patients]
-    except Exception as e:
-        flash(f'Error fetching patients: {str(e)}', 'danger')
-        form.patient_id.choices = []
-    
     if form.validate_on_submit():
         try:
             # Create invoice in database
@@ -85,6 +116,7 @@ def create():
             }
             
             response = supabase_client.table('invoices').insert(invoice_data).execute()
+            patient_chart.invalidate(form.patient_id.data)
             flash('Invoice created successfully!', 'success')
             return redirect(url_for('billing.list'))
         except Exception as e:
@@ -100,7 +132,7 @@ def view(id):
         response = supabase_client.table('invoices').select('*, patients(name)').eq('id', id).execute()
         if response.data:
             invoice = response.data[0]
-            return render_template('billing/view.html', invoice=invoice)
+            return conditional_render('billing/view.html', invoice=invoice)
         else:
             flash('Invoice not found.', 'warning')
             return redirect(url_for('billing.list'))
@@ -108,6 +140,35 @@ def view(id):
         flash(f'Error fetching invoice details: {str(e)}', 'danger')
         return redirect(url_for('billing.list'))
 
+@billing_bp.route('/pdf/<id>')
+@login_required
+def pdf(id):
+    try:
+        response = supabase_client.table('invoices').select(INVOICE_COLUMNS).eq('id', id).execute()
+        if not response.data:
+            flash('Invoice not found.', 'warning')
+            return redirect(url_for('billing.list'))
+        
+        # Served from cache unless the invoice changed since it was last rendered
+        path = invoice_pdf(response.data[0])
+        return send_file(path, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'invoice-{id}.pdf')
+    except Exception as e:
+        flash(f'Error generating invoice PDF: {str(e)}', 'danger')
+        return redirect(url_for('billing.view', id=id))
+
+@billing_bp.cli.command('render-pdfs')
+@click.argument('month')
+def render_pdfs_command(month):
+    """Render PDFs for every invoice dated in MONTH (YYYY-MM)."""
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        raise click.BadParameter(f"'{month}' is not a month in YYYY-MM form.", param_hint='MONTH')
+    result = render_month(month)
+    click.echo(f"{result['invoices']} invoices: {result['rendered']} rendered, "
+               f"{result['cached']} already cached, {result['failed']} failed.")
+
 @billing_bp.route('/edit/<id>', methods=['GET', 'POST'])
 @login_required
 def edit(id):
@@ -122,11 +183,6 @@ def edit(id):
         
         invoice = response.data[0]
         
-        # Populate patient dropdown
-        patients_response = supabase_client.table('patients').select('id, name').order('name').execute()
-        patients = patients_response.data if patients_response.data else []
-        form.patient_id.choices = [(pat['id'], pat['name']) for pat in patients]
-        
         if request.method == 'GET':
             # Populate form with invoice data
             form.patient_id.data = invoice['patient_id']
@@ -149,6 +205,8 @@ def edit(id):
             }
             
             supabase_client.table('invoices').update(invoice_data).eq('id', id).execute()
+            patient_chart.invalidate(invoice['patient_id'])
+            patient_chart.invalidate(form.patient_id.data)
             flash('Invoice updated successfully!', 'success')
             return redirect(url_for('billing.view', id=id))
             
@@ -1,7 +1,7 @@
 from flask import Blueprint, render_template, flash
 from flask_login import login_required, current_user
 # from app import supabase_client
-from extensions import supabase_client
+from stats import dashboard_stats
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
@@ -10,29 +10,14 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 def index():
     # Fetch statistics for the dashboard
     try:
-        # Get patient count
-        patients_response = supabase_client.table('patients').select('count', count='exact').execute()
-        patient_count = patients_response.count if hasattr(patients_response, 'count') else 0
-        
-        # Get appointment count
-        appointments_response = supabase_client.table('appointments').select('count', count='exact').execute()
-        appointment_count = appointments_response.count if hasattr(appointments_response, 'count') else 0
-        
-        # Get today's appointments
-        import datetime
-        today = datetime.date.today().isoformat()
-        today_appointments_response = supabase_client.table('appointments').select('count', count='exact').eq('date', today).execute()
-        today_appointment_count = today_appointments_response.count if hasattr(today_appointments_response, 'count') else 0
-        
-        # Get doctor count
-        doctors_response = supabase_client.table('users').select('count', count='exact').eq('role', 'doctor').execute()
-        doctor_count = doctors_response.count if hasattr(doctors_response, 'count') else 0
+        # Counts are fetched concurrently and cached briefly
+        stats = dashboard_stats.get()
         
         return render_template('dashboard/index.html', 
-                              patient_count=patient_count,
-                              appointment_count=appointment_count,
-                              today_appointment_count=today_appointment_count,
-                              doctor_count=doctor_count)
+                              patient_count=stats['patient_count'],
+                              appointment_count=stats['appointment_count'],
+                              today_appointment_count=stats['today_appointment_count'],
+                              doctor_count=stats['doctor_count'])
     except Exception as e:
         flash(f'Error loading dashboard data: {str(e)}', 'danger')
         return render_template('dashboard/index.html', error=True)
\ No newline at end of file
@@ -2,34 +2,49 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, TextAreaField, EmailField, SubmitField
-from wtforms.validators import DataRequired, Email, Optional, Length
+from wtforms.validators import DataRequired, Email, Optional, Length, ValidationError
 from extensions import supabase_client
+from fanout import fetch_concurrently
+from models import User
+from reference_data import doctor_choices, doctor_hours
+from availability import parse_working_hours
+from schema import doctor_working_hours
 from datetime import datetime
 
 doctors_bp = Blueprint('doctors', __name__, url_prefix='/doctors')
 
+DEPARTMENTS = [
+    ('cardiology', 'Cardiology'),
+    ('neurology', 'Neurology'),
+    ('orthopedics', 'Orthopedics'),
+    ('pediatrics', 'Pediatrics'),
+    ('general_medicine', 'General Medicine'),
+    ('gynecology', 'Gynecology'),
+    ('ophthalmology', 'Ophthalmology'),
+    ('dermatology', 'Dermatology'),
+    ('psychiatry', 'Psychiatry'),
+    ('ent', 'ENT')
+]
+
 class DoctorForm(FlaskForm):
     name = StringField('Full Name', validators=[DataRequired()])
     email = EmailField('Email', validators=[DataRequired(), Email()])
     phone = StringField('Phone Number', validators=[DataRequired()])
     specialty = StringField('Specialty', validators=[DataRequired()])
-    department = SelectField('Department', choices=[
-        ('cardiology', 'Cardiology'),
-        ('neurology', 'Neurology'),
-        ('orthopedics', 'Orthopedics'),
-        ('pediatrics', 'Pediatrics'),
-        ('general_medicine', 'General Medicine'),
-        ('gynecology', 'Gynecology'),
-        ('ophthalmology', 'Ophthalmology'),
-        ('dermatology', 'Dermatology'),
-        ('psychiatry', 'Psychiatry'),
-        ('ent', 'ENT')
-    ])
+    department = SelectField('Department', choices=DEPARTMENTS)
     qualification = StringField('Qualification', validators=[DataRequired()])
     experience = StringField('Experience (in years)', validators=[DataRequired()])
+    working_hours = StringField('Working Hours', validators=[Optional()],
+                                description='e.g. mon-fri 09:00-13:00,14:00-17:00; sat 09:00-12:00')
     bio = TextAreaField('Professional Bio', validators=[Optional()])
     submit = SubmitField('Save Doctor')
 
+    def validate_working_hours(self, field):
+        try:
+            parse_working_hours(field.data)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
 @doctors_bp.route('/')
 @login_required
 def list():
@@ -76,12 +91,16 @@ def add():
                 'department': form.department.data,
                 'qualification': form.qualification.data,
                 'experience': form.experience.data,
+                'working_hours': form.working_hours.data or None,
                 'bio': form.bio.data,
                 'created_at': datetime.now().isoformat(),
                 'created_by': current_user.id
             }
             
-            supabase_client.table('users').insert(doctor_data).execute()
+            doctor_working_hours.run(lambda: supabase_client.table('users').insert(
+                doctor_working_hours.payload(doctor_data)).execute())
+            doctor_choices.invalidate()
+            doctor_hours.invalidate()
             
             flash(f'Doctor added successfully! Temporary password: {temp_password}', 'success')
             return redirect(url_for('doctors.list'))
@@ -94,15 +113,19 @@ def add():
 @login_required
 def view(id):
     try:
-        # Get doctor details
-        response = supabase_client.table('users').select('*').eq('id', id).eq('role', 'doctor').execute()
+        # Get doctor details and upcoming appointments at once
+        futures = fetch_concurrently(
+            doctor=lambda: supabase_client.table('users').select('*').eq('id', id).eq('role', 'doctor').execute(),
+            appointments=lambda: supabase_client.table('appointments').select(
+                '*, patients(name)'
+            ).eq('doctor_id', id).order('date', desc=False).limit(5).execute()
+        )
+        response = futures['doctor'].result()
         if response.data:
             doctor = response.data[0]
             
             # Get doctor's upcoming appointments
-            appointments_response = supabase_client.table('appointments').select(
-                '*, patients(name)'
-            ).eq('doctor_id', id).order('date', desc=False).limit(5).execute()
+            appointments_response = futures['appointments'].result()
             
             appointments = appointments_response.data if appointments_response.data else []
             
@@ -140,6 +163,7 @@ def edit(id):
             form.department.data = doctor.get('department')
             form.qualification.data = doctor.get('qualification')
             form.experience.data = doctor.get('experience')
+            form.working_hours.data = doctor.get('working_hours')
             form.bio.data = doctor.get('bio')
         
         if form.validate_on_submit():
@@ -153,11 +177,16 @@ def edit(id):
                     'department': form.department.data,
                     'qualification': form.qualification.data,
                     'experience': form.experience.data,
+                    'working_hours': form.working_hours.data or None,
                     'bio': form.bio.data,
                     'updated_at': datetime.now().isoformat()
                 }
                 
-                supabase_client.table('users').update(doctor_data).eq('id', id).execute()
+                doctor_working_hours.run(lambda: supabase_client.table('users').update(
+                    doctor_working_hours.payload(doctor_data)).eq('id', id).execute())
+                User.invalidate(id)
+                doctor_choices.invalidate()
+                doctor_hours.invalidate()
                 flash('Doctor information updated successfully!', 'success')
                 return redirect(url_for('doctors.view', id=id))
             except Exception as e:
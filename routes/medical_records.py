@@ -3,18 +3,27 @@ from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, TextAreaField, SelectField, DateField, HiddenField, SubmitField
-from wtforms.validators import DataRequired, Optional
-from werkzeug.utils import secure_filename
+from wtforms.validators import DataRequired, Optional, ValidationError
 import os
-import uuid
-from datetime import datetime
+from datetime import datetime, timezone
+from config import Config
 from extensions import supabase_client
+from conditional import conditional_render
+from fanout import fetch_concurrently
+from patient_chart import patient_chart
+from attachments import upload_attachment, attachment_size, size_limit
+from schema import record_checksum
+from reference_data import doctor_choices
+from fields import PatientField
+from record_search import record_search
+from thumbnails import thumbnail_name, thumbnail_url
+from exports import export_response
 
 medical_records_bp = Blueprint('medical_records', __name__, url_prefix='/medical-records')
 
 # Form class for medical records
 class MedicalRecordForm(FlaskForm):
-    patient_id = SelectField('Patient', validators=[DataRequired()], coerce=str)
+    patient_id = PatientField('Patient', validators=[DataRequired()])
     doctor_id = SelectField('Doctor', validators=[DataRequired()], coerce=str)
     record_type = SelectField('Record Type', choices=[
         ('consultation', 'Consultation'),
@@ -34,6 +43,18 @@ class MedicalRecordForm(FlaskForm):
     ])
     submit = SubmitField('Save Record')
 
+    def validate_attachments(self, field):
+        # Only imaging studies may use the raised upload limit
+        limit = size_limit(self.record_type.data)
+        if field.data and attachment_size(field.data) > limit:
+            raise ValidationError(f'Attachment is larger than {limit // (1024 * 1024)}MB.')
+
+@medical_records_bp.before_request
+def allow_large_attachments():
+    # Let imaging uploads past the app-wide limit; the form enforces per-type limits
+    if Config.IMAGING_MAX_CONTENT_LENGTH and request.endpoint in ('medical_records.add', 'medical_records.edit'):
+        request.max_content_length = max(Config.IMAGING_MAX_CONTENT_LENGTH, Config.MAX_CONTENT_LENGTH)
+
 @medical_records_bp.route('/')
 @login_required
 def list():
@@ -44,26 +65,75 @@ def list():
         ).order('record_date', desc=True).execute()
         
         records = response.data if response.data else []
-        return render_template('medical_records/list.html', records=records)
+        return conditional_render('medical_records/list.html', records=records)
     except Exception as e:
         flash(f'Error fetching medical records: {str(e)}', 'danger')
         return render_template('medical_records/list.html', records=[])
 
+@medical_records_bp.route('/search')
+@login_required
+def search():
+    q = request.args.get('q', '').strip()
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    per_page = 20
+    if not q:
+        return redirect(url_for('medical_records.list'))
+    try:
+        # Rank matching record ids in memory, then fetch just this page
+        total, hits = record_search.search(q, page=page, per_page=per_page)
+        records = []
+        if hits:
+            response = supabase_client.table('medical_records').select(
+                '*, patients(name), users!doctor_id(name)'
+            ).in_('id', [record_id for record_id, score in hits]).execute()
+            by_id = {record['id']: record for record in (response.data or [])}
+            records = [by_id[record_id] for record_id, score in hits if record_id in by_id]
+        return conditional_render('medical_records/list.html', records=records, q=q,
+                                  page=page, per_page=per_page, total=total)
+    except Exception as e:
+        flash(f'Error searching medical records: {str(e)}', 'danger')
+        return render_template('medical_records/list.html', records=[], q=q,
+                               page=page, per_page=per_page, total=0)
+
+@medical_records_bp.route('/export')
+@login_required
+def export():
+    if current_user.role != 'admin':
+        flash('You do not have permission to export medical records.', 'warning')
+        return redirect(url_for('medical_records.list'))
+    
+    filters = {
+        'patient_id': request.args.get('patient_id', ''),
+        'record_type': request.args.get('record_type', ''),
+        'start_date': request.args.get('start_date', ''),
+        'end_date': request.args.get('end_date', '')
+    }
+    return export_response('medical_records', request.args.get('format', 'csv'), filters)
+
 @medical_records_bp.route('/add', methods=['GET', 'POST'])
 @login_required
 def add():
     form = MedicalRecordForm()
     
+    # Look up the patient (if any) and the doctor dropdown at the same time
+    patient_id = request.args.get('patient_id')
+    calls = {'doctors': doctor_choices.get}
+    if patient_id:
+        calls['patient'] = lambda: supabase_client.table('patients').select('*').eq('id', patient_id).execute()
+    futures = fetch_concurrently(**calls)
+    
     # Check if we're coming from a patient profile and retrieve patient info
     patient = None
-    if request.args.get('patient_id'):
+    if patient_id:
         try:
-            patient_id = request.args.get('patient_id')
             # Set the patient_id in the form
             form.patient_id.data = patient_id
             
             # Get patient details for display
-            patient_response = supabase_client.table('patients').select('*').eq('id', patient_id).execute()
+            patient_response = futures['patient'].result()
             if patient_response.data:
                 patient = patient_response.data[0]
         except Exception as e:
@@ -71,22 +141,11 @@ def add():
     
     # Populate the doctor dropdown
     try:
-        doctors_response = supabase_client.table('users').select('id, name').eq('role', 'doctor').execute()
-        doctors = doctors_response.data if doctors_response.data else []
-        form.doctor_id.choices = [(doc['id'], doc['name']) for doc in doctors]
+        form.doctor_id.choices = futures['doctors'].result()
     except Exception as e:
         flash(f'Error fetching doctors: {str(e)}', 'danger')
         form.doctor_id.choices = []
     
-    # Populate the patient dropdown
-    try:
-        patients_response = supabase_client.table('patients').select('id, name').execute()
-        patients = patients_response.data if patients_response.data else []
-        form.patient_id.choices = [(pat['id'], pat['name']) for pat in patients]
-    except Exception as e:
-        flash(f'Error fetching patients: {str(e)}', 'danger')
-        form.patient_id.choices = []
-    
     if form.validate_on_submit():
         try:
             # Print debugging info
@@ -95,21 +154,10 @@ def add():
             
             # Handle file upload
             attachment_url = None
+            attachment_checksum = None
             if form.attachments.data:
-                file_data = form.attachments.data
-                filename = secure_filename(file_data.filename)
-                # Generate unique filename
-                unique_filename = f"{uuid.uuid4()}_{filename}"
-                
-                # Save to Supabase storage
-                with file_data.stream as file_stream:
-                    supabase_client.storage.from_('medical-attachments').upload(
-                        unique_filename,
-                        file_stream.read()
-                    )
-                
-                # Get the public URL
-                attachment_url = supabase_client.storage.from_('medical-attachments').get_public_url(unique_filename)
+                # Stream to Supabase storage in chunks
+                unique_filename, attachment_url, attachment_checksum = upload_attachment(form.attachments.data)
             
             # Insert medical record into database
             record_data = {
@@ -122,14 +170,20 @@ def add():
                 'record_date': form.record_date.data.isoformat(),
                 'attachment_url': attachment_url,
                 'created_by': current_user.get_id(),
-                'created_at': datetime.now().isoformat()
+                'created_at': datetime.now(timezone.utc).isoformat()
             }
+            if attachment_checksum:
+                record_data['attachment_checksum'] = attachment_checksum
             
             # Add more detailed error handling
             try:
                 print("Attempting to insert record with data:", record_data)
-                response = supabase_client.table('medical_records').insert(record_data).execute()
+                response = record_checksum.run(lambda: supabase_client.table('medical_records').insert(
+                    record_checksum.payload(record_data)).execute())
                 print("Insert response:", response)
+                if response.data:
+                    record_search.upsert(response.data[0])
+                patient_chart.invalidate(form.patient_id.data)
                 flash('Medical record added successfully!', 'success')
                 
                 # If this was added from a patient profile, return there
@@ -158,7 +212,8 @@ def view(id):
         
         if response.data:
             record = response.data[0]
-            return render_template('medical_records/view.html', record=record)
+            return conditional_render('medical_records/view.html', record=record,
+                                      thumbnail_url=thumbnail_url(record.get('attachment_url')))
         else:
             flash('Medical record not found.', 'warning')
             return redirect(url_for('medical_records.list'))
@@ -170,18 +225,20 @@ def view(id):
 @login_required
 def patient_records(patient_id):
     try:
-        # Get patient details
-        patient_response = supabase_client.table('patients').select('*').eq('id', patient_id).execute()
+        # Get patient details and all of their medical records at once
+        futures = fetch_concurrently(
+            patient=lambda: supabase_client.table('patients').select('*').eq('id', patient_id).execute(),
+            records=lambda: supabase_client.table('medical_records').select(
+                '*, users!doctor_id(name)'
+            ).eq('patient_id', patient_id).order('record_date', desc=True).execute()
+        )
+        patient_response = futures['patient'].result()
         if not patient_response.data:
             flash('Patient not found.', 'warning')
             return redirect(url_for('patients.list'))
             
         patient = patient_response.data[0]
-        
-        # Get all medical records for this patient
-        records_response = supabase_client.table('medical_records').select(
-            '*, users!doctor_id(name)'
-        ).eq('patient_id', patient_id).order('record_date', desc=True).execute()
+        records_response = futures['records'].result()
         
         records = records_response.data if records_response.data else []
         
@@ -196,8 +253,12 @@ def patient_records(patient_id):
 @login_required
 def edit(id):
     try:
-        # Get record details
-        response = supabase_client.table('medical_records').select('*').eq('id', id).execute()
+        # Get record details and the doctor dropdown at once
+        futures = fetch_concurrently(
+            record=lambda: supabase_client.table('medical_records').select('*').eq('id', id).execute(),
+            doctors=doctor_choices.get
+        )
+        response = futures['record'].result()
         if not response.data:
             flash('Medical record not found.', 'warning')
             return redirect(url_for('medical_records.list'))
@@ -206,14 +267,7 @@ def edit(id):
         form = MedicalRecordForm()
         
         # Populate the doctor dropdown
-        doctors_response = supabase_client.table('users').select('id, name').eq('role', 'doctor').execute()
-        doctors = doctors_response.data if doctors_response.data else []
-        form.doctor_id.choices = [(doc['id'], doc['name']) for doc in doctors]
-        
-        # Populate the patient dropdown
-        patients_response = supabase_client.table('patients').select('id, name').execute()
-        patients = patients_response.data if patients_response.data else []
-        form.patient_id.choices = [(pat['id'], pat['name']) for pat in patients]
+        form.doctor_id.choices = futures['doctors'].result()
         
         if request.method == 'GET':
             # Populate form with record data
@@ -232,24 +286,14 @@ def edit(id):
             try:
                 # Handle file upload if new one is provided
                 attachment_url = record['attachment_url']  # Keep existing URL by default
+                attachment_checksum = None
                 if form.attachments.data:
-                    file_data = form.attachments.data
-                    filename = secure_filename(file_data.filename)
-                    # Generate unique filename
-                    unique_filename = f"{uuid.uuid4()}_{filename}"
-                    
-                    # Save to Supabase storage
-                    with file_data.stream as file_stream:
-                        supabase_client.storage.from_('medical-attachments').upload(
-                            unique_filename,
-                            file_stream.read()
-                        )
-                    
-                    # Get the public URL
-                    attachment_url = supabase_client.storage.from_('medical-attachments').get_public_url(unique_filename)
+                    # Stream to Supabase storage in chunks
+                    unique_filename, attachment_url, attachment_checksum = upload_attachment(form.attachments.data)
                 
                 # Update medical record in database
                 record_data = {
+                    'patient_id': form.patient_id.data,
                     'doctor_id': form.doctor_id.data,
                     'record_type': form.record_type.data,
                     'diagnosis': form.diagnosis.data,
@@ -258,10 +302,18 @@ def edit(id):
                     'record_date': form.record_date.data.isoformat(),
                     'attachment_url': attachment_url,
                     'updated_by': current_user.get_id(),
-                    'updated_at': datetime.now().isoformat()
+                    'updated_at': datetime.now(timezone.utc).isoformat()
                 }
+                if attachment_checksum:
+                    record_data['attachment_checksum'] = attachment_checksum
                 
-                supabase_client.table('medical_records').update(record_data).eq('id', id).execute()
+                record_checksum.run(lambda: supabase_client.table('medical_records').update(
+                    record_checksum.payload(record_data)).eq('id', id).execute())
+                record_search.upsert({'id': record['id'], **record_data})
+                # The record may have moved to another patient
+                patient_chart.invalidate(record['patient_id'])
+                if form.patient_id.data != record['patient_id']:
+                    patient_chart.invalidate(form.patient_id.data)
                 flash('Medical record updated successfully!', 'success')
                 return redirect(url_for('medical_records.view', id=id))
             except Exception as e:
@@ -290,13 +342,15 @@ def delete(id):
                 # Extract filename from URL
                 filename = os.path.basename(record['attachment_url'])
                 try:
-                    supabase_client.storage.from_('medical-attachments').remove(filename)
+                    supabase_client.storage.from_('medical-attachments').remove([filename, thumbnail_name(filename)])
                 except:
                     # If file doesn't exist or some other error, continue anyway
                     pass
             
             # Delete the record
             supabase_client.table('medical_records').delete().eq('id', id).execute()
+            record_search.remove(record['id'])
+            patient_chart.invalidate(record['patient_id'])
             flash('Medical record deleted successfully!', 'success')
         else:
             flash('Medical record not found.', 'warning')
@@ -1,13 +1,37 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, DateField, TextAreaField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Email, Optional
 from extensions import supabase_client
+from conditional import conditional_render
+from pagination import fetch_page, page_size_arg
+from patient_index import patient_index
+from patient_chart import patient_chart
+from patient_import import import_patients
+from stats import dashboard_stats
+import click
+import io
 from datetime import datetime  # Add this import
+import re
 
 patients_bp = Blueprint('patients', __name__, url_prefix='/patients')
 
+# Columns shown on the list page plus the keyset sort columns
+LIST_COLUMNS = 'id, name, email, phone, gender, blood_group, created_at'
+LIST_ORDER = ['created_at', 'id']
+PHONE_QUERY = re.compile(r'^[\d\s()+-]+$')
+
+def apply_patient_search(query, q):
+    # Strip characters with meaning in PostgREST filters and LIKE patterns
+    q = re.sub(r'[,()*%_\\"]', '', q).strip()
+    if not q:
+        return query
+    if PHONE_QUERY.match(q):
+        return query.ilike('phone', f'{q}%')
+    return query.ilike('name', f'%{q}%')
+
 class PatientForm(FlaskForm):
     name = StringField('Full Name', validators=[DataRequired()])
     email = StringField('Email', validators=[Optional(), Email()])
@@ -32,17 +56,43 @@ class PatientForm(FlaskForm):
     medical_history = TextAreaField('Medical History', validators=[Optional()])
     submit = SubmitField('Save Patient')
 
+class PatientImportForm(FlaskForm):
+    csv_file = FileField('CSV File', validators=[FileRequired(), FileAllowed(['csv'], 'CSV files only!')])
+    submit = SubmitField('Import Patients')
+
 @patients_bp.route('/')
 @login_required
 def list():
+    q = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor', '')
+    page_size = page_size_arg(request.args.get('per_page'))
     try:
-        # Get all patients
-        response = supabase_client.table('patients').select('*').execute()
-        patients = response.data if response.data else []
-        return render_template('patients/list.html', patients=patients)
+        # Get one page of patients, newest first
+        query = supabase_client.table('patients').select(LIST_COLUMNS)
+        query = apply_patient_search(query, q)
+        patients, next_cursor = fetch_page(query, LIST_ORDER, cursor=cursor, page_size=page_size, desc=True)
+        return conditional_render('patients/list.html', patients=patients, q=q,
+                                  cursor=cursor, next_cursor=next_cursor, per_page=page_size)
     except Exception as e:
         flash(f'Error fetching patients: {str(e)}', 'danger')
-        return render_template('patients/list.html', patients=[])
+        return render_template('patients/list.html', patients=[], q=q,
+                               cursor=cursor, next_cursor=None, per_page=page_size)
+
+@patients_bp.route('/lookup')
+@login_required
+def lookup():
+    # Typeahead search used by patient fields on other forms
+    q = request.args.get('q', '').strip()
+    if len(q) < 2:
+        return jsonify({'results': []})
+    try:
+        limit = min(int(request.args.get('limit', 10)), 50)
+    except ValueError:
+        limit = 10
+    try:
+        return jsonify({'results': patient_index.search(q, limit=limit)})
+    except Exception as e:
+        return jsonify({'results': [], 'error': str(e)}), 500
 
 @patients_bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -71,6 +121,8 @@ def add():
             }
             
             response = supabase_client.table('patients').insert(patient_data).execute()
+            if response.data:
+                patient_index.upsert(response.data[0])
             flash('Patient added successfully!', 'success')
             return redirect(url_for('patients.list'))
         except Exception as e:
@@ -78,15 +130,49 @@ def add():
     
     return render_template('patients/add.html', form=form)
 
+@patients_bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def bulk_import():
+    if current_user.role not in ['admin', 'staff']:
+        flash('You do not have permission to import patients.', 'warning')
+        return redirect(url_for('patients.list'))
+    
+    form = PatientImportForm()
+    result = None
+    if form.validate_on_submit():
+        try:
+            # Read the upload as text without loading it all at once
+            stream = io.TextIOWrapper(form.csv_file.data.stream, encoding='utf-8-sig', newline='')
+            result = import_patients(stream, registered_by=current_user.get_id())
+            patient_index.invalidate()
+            dashboard_stats.invalidate()
+            flash(f'Imported {result.inserted} of {result.rows} patients.',
+                  'success' if not result.failed else 'warning')
+        except Exception as e:
+            flash(f'Error importing patients: {str(e)}', 'danger')
+    
+    return render_template('patients/import.html', form=form, result=result)
+
+@patients_bp.cli.command('import')
+@click.argument('csv_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, default=None, help='Rows per insert (defaults to IMPORT_BATCH_SIZE).')
+@click.option('--registered-by', default=None, help='User id recorded as registering the patients.')
+def import_command(csv_path, batch_size, registered_by):
+    """Bulk import patients from a CSV file."""
+    with open(csv_path, encoding='utf-8-sig', newline='') as stream:
+        result = import_patients(stream, registered_by=registered_by, batch_size=batch_size)
+    click.echo(f'Read {result.rows} rows: {result.inserted} inserted, {result.failed} failed.')
+    for line, message in result.errors:
+        click.echo(f'  line {line}: {message}', err=True)
+
 @patients_bp.route('/view/<id>')
 @login_required
 def view(id):
     try:
-        # Get patient details
-        response = supabase_client.table('patients').select('*').eq('id', id).execute()
-        if response.data:
-            patient = response.data[0]
-            return render_template('patients/view.html', patient=patient)
+        # Patient, appointments, records and invoices in one concurrent fetch
+        chart = patient_chart.get(id)
+        if chart:
+            return conditional_render('patients/view.html', **chart)
         else:
             flash('Patient not found.', 'warning')
             return redirect(url_for('patients.list'))
@@ -138,6 +224,8 @@ def edit(id):
                 }
                 
                 supabase_client.table('patients').update(patient_data).eq('id', id).execute()
+                patient_index.upsert({'id': patient['id'], **patient_data})
+                patient_chart.invalidate(patient['id'])
                 flash('Patient updated successfully!', 'success')
                 return redirect(url_for('patients.view', id=id))
             except Exception as e:
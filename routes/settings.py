@@ -1,9 +1,16 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SelectField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, EqualTo, Optional
-from extensions import supabase_client
+from extensions import supabase_client, user_auth
+from http_pool import http_pool
+from models import User
+import reference_data
+from patient_index import patient_index
+from patient_chart import patient_chart
+from record_search import record_search
+from scheduling import schedule_index
 from datetime import datetime
 
 settings_bp = Blueprint('settings', __name__, url_prefix='/settings')
@@ -61,6 +68,10 @@ def profile():
                 
                 # Update the user record
                 supabase_client.table('users').update(user_data).eq('id', current_user.get_id()).execute()
+                User.invalidate(current_user.get_id())
+                if current_user.role == 'doctor':
+                    reference_data.doctor_choices.invalidate()
+                    reference_data.doctor_hours.invalidate()
                 flash('Profile updated successfully!', 'success')
                 return redirect(url_for('settings.profile'))
             
@@ -71,7 +82,7 @@ def profile():
         elif form_type == 'password' and password_form.validate_on_submit():
             try:
                 # Verify current password
-                response = supabase_client.auth.sign_in_with_password(
+                response = user_auth().sign_in_with_password(
                     credentials={"email": current_user.email, "password": password_form.current_password.data}
                 )
                 
@@ -112,4 +123,19 @@ def system():
         flash('You do not have permission to access system settings.', 'warning')
         return redirect(url_for('dashboard.index'))
     
-    return render_template('settings/system.html')
\ No newline at end of file
+    return render_template('settings/system.html')
+
+@settings_bp.route('/system/cache')
+@login_required
+def cache_stats():
+    # Only admin users should see cache statistics
+    if current_user.role != 'admin':
+        flash('You do not have permission to access system settings.', 'warning')
+        return redirect(url_for('dashboard.index'))
+    
+    return jsonify({'users': User.cache_stats(), 'reference_data': reference_data.cache_stats(),
+                    'patient_index': patient_index.stats(),
+                    'patient_chart': patient_chart.stats(),
+                    'record_search': record_search.stats(),
+                    'schedule_index': schedule_index.stats(),
+                    'http_pool': http_pool.stats()})
\ No newline at end of file
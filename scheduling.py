@@ -0,0 +1,199 @@
+import threading
+from bisect import bisect_left, insort
+from datetime import timedelta
+from cache import TTLCache
+from config import Config
+from extensions import supabase_client
+from pagination import fetch_page
+from schema import appointment_duration
+
+# Statuses that keep a doctor's time booked
+BLOCKING_STATUSES = ('scheduled', 'confirmed', 'completed')
+_LOCK_STRIPES = 64
+
+def to_minutes(value):
+    """Minutes since midnight for a time, or an 'HH:MM' / 'HH:MM:SS' string"""
+    if isinstance(value, str):
+        parts = value.split(':')
+        return int(parts[0]) * 60 + int(parts[1])
+    return value.hour * 60 + value.minute
+
+def appointment_interval(row):
+    start = to_minutes(row['time'])
+    return start, start + int(row.get('duration') or Config.APPOINTMENT_DURATION)
+
+class DaySchedule:
+    """Booked intervals for one doctor on one day, sorted by start minute.
+
+    `_reach[i]` is the latest end among the first i+1 intervals, so a slot
+    is free when every interval starting before its end has finished by its
+    start: one bisect and one lookup, however full the day is.
+    """
+
+    def __init__(self):
+        self._intervals = []  # (start, end, appointment_id)
+        self._reach = []
+        self._mask = None  # (slot_minutes, busy bitmap)
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def _reindex(self, start_at=0):
+        self._mask = None
+        del self._reach[start_at:]
+        reach = self._reach[-1] if self._reach else -1
+        for start, end, appointment_id in self._intervals[start_at:]:
+            reach = max(reach, end)
+            self._reach.append(reach)
+
+    def add(self, appointment_id, start, end):
+        self.remove(appointment_id)
+        insort(self._intervals, (start, end, str(appointment_id)))
+        self._reindex(bisect_left(self._intervals, (start, end, str(appointment_id))))
+
+    def remove(self, appointment_id):
+        appointment_id = str(appointment_id)
+        for i, interval in enumerate(self._intervals):
+            if interval[2] == appointment_id:
+                del self._intervals[i]
+                self._reindex(i)
+                return True
+        return False
+
+    def conflicts(self, start, end, exclude=None):
+        """Ids of booked appointments overlapping [start, end)"""
+        i = bisect_left(self._intervals, (end,))
+        if i == 0 or self._reach[i - 1] <= start:
+            return []
+        found = []
+        # Walk back only while something earlier can still reach past `start`
+        while i > 0 and self._reach[i - 1] > start:
+            i -= 1
+            other_start, other_end, appointment_id = self._intervals[i]
+            if other_end > start and appointment_id != exclude:
+                found.append(appointment_id)
+        return found
+
+    def intervals(self):
+        return [(start, end) for start, end, appointment_id in self._intervals]
+
+    def busy_mask(self, slot_minutes):
+        """Bitmap of the day's slots touched by a booking (bit i is slot i)"""
+        if self._mask is None or self._mask[0] != slot_minutes:
+            mask = 0
+            for start, end, appointment_id in self._intervals:
+                first = start // slot_minutes
+                last = -(-end // slot_minutes)
+                mask |= ((1 << (last - first)) - 1) << first
+            self._mask = (slot_minutes, mask)
+        return self._mask[1]
+
+class ScheduleIndex:
+    """Per-doctor, per-day interval index of booked appointments.
+
+    Days are loaded on first use with one query and then kept current by the
+    routes that schedule, edit and cancel appointments. The TTL bounds how
+    long bookings made by other processes can go unseen, which is fine for
+    availability and warnings; rejecting a booking re-reads the day.
+    """
+
+    def __init__(self, maxsize=4096, ttl=60):
+        self._days = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+    def lock(self, doctor_id, day):
+        """Lock to hold across check-then-insert for one doctor and day"""
+        return self._stripes[hash((str(doctor_id), str(day))) % _LOCK_STRIPES]
+
+    def _load(self, doctor_id, day):
+        response = appointment_duration.run(lambda: supabase_client.table('appointments').select(
+            appointment_duration.select('id, time, status')).eq('doctor_id', doctor_id).eq(
+            'date', day).in_('status', list(BLOCKING_STATUSES)).execute())
+        schedule = DaySchedule()
+        for row in response.data or []:
+            schedule.add(row['id'], *appointment_interval(row))
+        return schedule
+
+    def load_range(self, doctor_ids, start_date, end_date):
+        """Load every day in the range not already indexed, for all doctors, in one query"""
+        days = [str(start_date + timedelta(days=offset)) for offset in range((end_date - start_date).days + 1)]
+        doctor_ids = [str(doctor_id) for doctor_id in doctor_ids]
+        missing = {(doctor_id, day) for doctor_id in doctor_ids for day in days
+                   if self._days.get((doctor_id, day)) is None}
+        if not missing:
+            return
+        doctor_filter = sorted({doctor_id for doctor_id, day in missing})
+
+        def load():
+            loaded = {key: DaySchedule() for key in missing}
+            cursor = None
+            while True:
+                query = supabase_client.table('appointments').select(
+                    appointment_duration.select('id, doctor_id, date, time, status')).in_(
+                    'doctor_id', doctor_filter).gte('date', start_date.isoformat()).lte(
+                    'date', end_date.isoformat()).in_('status', list(BLOCKING_STATUSES))
+                rows, cursor = fetch_page(query, ['date', 'time', 'id'], cursor=cursor, page_size=1000)
+                for row in rows:
+                    schedule = loaded.get((str(row['doctor_id']), str(row['date'])))
+                    if schedule is not None:
+                        schedule.add(row['id'], *appointment_interval(row))
+                if cursor is None:
+                    return loaded
+
+        for key, schedule in appointment_duration.run(load).items():
+            self._days.set(key, schedule)
+
+    def busy_mask(self, doctor_id, day, slot_minutes):
+        schedule = self.day(doctor_id, day)
+        with self._lock:
+            return schedule.busy_mask(slot_minutes)
+
+    def day(self, doctor_id, day, fresh=False):
+        """The doctor's booked intervals for a day; `fresh` re-reads them from the database"""
+        key = (str(doctor_id), str(day))
+        schedule = None if fresh else self._days.get(key)
+        if schedule is None:
+            schedule = self._load(doctor_id, day)
+            self._days.set(key, schedule)
+        return schedule
+
+    def conflicts(self, doctor_id, day, start_time, duration, exclude=None, fresh=False):
+        """Ids of bookings overlapping the slot.
+
+        The cached day may be missing bookings made by other processes for
+        up to the TTL, so a check that decides whether to save passes
+        `fresh=True`.
+        """
+        start = to_minutes(start_time)
+        schedule = self.day(doctor_id, day, fresh=fresh)
+        with self._lock:
+            return schedule.conflicts(start, start + int(duration), exclude=str(exclude) if exclude else None)
+
+    def add(self, row):
+        """Record a saved appointment row (removing it if it no longer blocks time)"""
+        schedule = self._days.get((str(row['doctor_id']), str(row['date'])))
+        if schedule is None:
+            return
+        with self._lock:
+            if row.get('status') in BLOCKING_STATUSES:
+                schedule.add(row['id'], *appointment_interval(row))
+            else:
+                schedule.remove(row['id'])
+
+    def remove(self, row):
+        schedule = self._days.get((str(row['doctor_id']), str(row['date'])))
+        if schedule is not None:
+            with self._lock:
+                schedule.remove(row['id'])
+
+    def invalidate(self, doctor_id=None, day=None):
+        if doctor_id is None:
+            self._days.clear()
+        else:
+            self._days.invalidate((str(doctor_id), str(day)))
+
+    def stats(self):
+        return self._days.stats()
+
+schedule_index = ScheduleIndex(ttl=Config.SCHEDULE_INDEX_TTL)
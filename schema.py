@@ -0,0 +1,61 @@
+import threading
+import time
+
+# How long to go without a missing column before trying it again, so a
+# database migrated while the app runs is picked up without a restart
+RECHECK_SECONDS = 300
+
+# PostgREST's codes for an unknown column in a select/filter and in a write
+_MISSING_COLUMN_CODES = ('42703', 'PGRST204')
+
+class OptionalColumn:
+    """A column added by an upgrade migration (see README) that may not exist yet.
+
+    Queries that read or write it go through `run`, building their select
+    list with `select` and their payload with `payload`. If the database says
+    the column doesn't exist, the query is rebuilt without it and callers
+    fall back to their default until the migration is run.
+    """
+
+    def __init__(self, table, name):
+        self.table = table
+        self.name = name
+        self._missing_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        with self._lock:
+            return self._missing_at is None or time.monotonic() - self._missing_at >= RECHECK_SECONDS
+
+    def select(self, columns):
+        """`columns` plus this column while the database has it"""
+        return f'{columns}, {self.name}' if self.available else columns
+
+    def payload(self, data):
+        """`data` without this column while the database lacks it"""
+        if self.available:
+            return data
+        return {key: value for key, value in data.items() if key != self.name}
+
+    def is_missing(self, error):
+        return (getattr(error, 'code', None) in _MISSING_COLUMN_CODES
+                and self.name in (getattr(error, 'message', None) or ''))
+
+    def run(self, query):
+        """Call `query()`, and once more without this column if the database doesn't have it"""
+        try:
+            return query()
+        except Exception as e:
+            if not self.is_missing(e):
+                raise
+            with self._lock:
+                first = self._missing_at is None
+                self._missing_at = time.monotonic()
+            if first:
+                print(f"{self.table}.{self.name} does not exist yet; run the upgrade migration in README.md")
+            return query()
+
+appointment_duration = OptionalColumn('appointments', 'duration')
+record_checksum = OptionalColumn('medical_records', 'attachment_checksum')
+doctor_working_hours = OptionalColumn('users', 'working_hours')
@@ -0,0 +1,125 @@
+"""Serve the app in production with gunicorn.
+
+    flask --app app serve --workers 4 --threads 8
+
+The app is built once in the master process and forked into the workers
+(gunicorn's preload), so imported modules and compiled templates are
+shared copy-on-write instead of being rebuilt per worker. Each worker then
+warms its own caches before it accepts a connection; data clients are never
+shared across a fork (see `extensions.LazyClient`).
+
+`kill -HUP <master pid>` replaces the workers one generation at a time,
+letting in-flight requests finish (up to --graceful-timeout). Because the
+code is preloaded, a HUP does not pick up code changes; for a deploy send
+USR2 to start a new master, then QUIT to the old one.
+"""
+import os
+import time
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from config import Config
+
+def default_workers():
+    return Config.SERVE_WORKERS or (os.cpu_count() or 1) * 2 + 1
+
+def compile_templates(app):
+    """Load every template into the Jinja cache; returns how many"""
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+def warm_up(app):
+    """Fill the caches the first requests in a worker would otherwise pay for.
+
+    Failures are reported and skipped: a worker that can't reach the data
+    backend yet should still come up and serve what it can.
+    """
+    from reference_data import doctor_choices, doctor_hours
+    from stats import dashboard_stats
+    started = time.perf_counter()
+    warmed = []
+    with app.app_context():
+        for name, load in (('doctor choices', doctor_choices.get), ('doctor hours', doctor_hours.get),
+                           ('dashboard stats', dashboard_stats.get)):
+            try:
+                load()
+                warmed.append(name)
+            except Exception as e:
+                print(f"Warm-up skipped {name}: {e}")
+    print(f"Worker {os.getpid()} warmed {', '.join(warmed) or 'nothing'} "
+          f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+def _server_class():
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise click.ClickException('gunicorn is not installed (pip install gunicorn)')
+
+    class Server(BaseApplication):
+        """gunicorn around an app that has already been built"""
+
+        def __init__(self, app, options):
+            self.application = app
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return self.application
+
+    return Server
+
+@click.command('serve')
+@click.option('--bind', '-b', default=lambda: Config.SERVE_BIND, show_default='SERVE_BIND or 0.0.0.0:8000',
+              help='Address to listen on.')
+@click.option('--workers', '-w', type=int, default=default_workers, show_default='SERVE_WORKERS or 2 x CPUs + 1',
+              help='Worker processes.')
+@click.option('--threads', '-t', type=int, default=lambda: Config.SERVE_THREADS, show_default='SERVE_THREADS or 4',
+              help='Request threads per worker.')
+@click.option('--timeout', type=int, default=lambda: Config.SERVE_TIMEOUT, show_default='SERVE_TIMEOUT or 60',
+              help='Seconds a request may run before its worker is restarted.')
+@click.option('--graceful-timeout', type=int, default=lambda: Config.SERVE_GRACEFUL_TIMEOUT,
+              show_default='SERVE_GRACEFUL_TIMEOUT or 30', help='Seconds workers get to finish on reload or shutdown.')
+@click.option('--max-requests', type=int, default=lambda: Config.SERVE_MAX_REQUESTS,
+              show_default='SERVE_MAX_REQUESTS or 0 (never)', help='Recycle a worker after this many requests.')
+@click.option('--warm-up/--no-warm-up', 'warm', default=lambda: Config.SERVE_WARM_UP, show_default='SERVE_WARM_UP or on',
+              help='Prime reference caches in each worker before it accepts traffic.')
+@with_appcontext
+def serve_command(bind, workers, threads, timeout, graceful_timeout, max_requests, warm):
+    """Run the app under gunicorn with preloaded, pre-warmed workers."""
+    app = current_app._get_current_object()
+    Server = _server_class()
+
+    # Shared by every worker through the fork
+    print(f"Compiled {compile_templates(app)} templates")
+
+    def post_fork(server, worker):
+        # Runs in the new worker before its accept loop starts. The master
+        # starts no threads of its own: a fork taken while one held a lock
+        # would leave that lock held forever in the worker.
+        if warm:
+            warm_up(app)
+        from overdue import start_overdue_scheduler
+        start_overdue_scheduler()
+
+    options = {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'timeout': timeout,
+        'graceful_timeout': graceful_timeout,
+        'max_requests': max_requests,
+        # Stagger recycling so workers don't all restart at once
+        'max_requests_jitter': max_requests // 10,
+        'keepalive': 5,
+        'post_fork': post_fork
+    }
+    print(f"Serving on {bind} with {workers} workers x {threads} threads")
+    Server(app, options).run()
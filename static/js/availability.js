@@ -0,0 +1,65 @@
+// Next free slots for the appointment schedule form
+(function () {
+    var panel = document.getElementById('availability');
+    if (!panel) {
+        return;
+    }
+    var department = document.getElementById('availability-department');
+    var from = document.getElementById('availability-date');
+    var results = document.getElementById('availability-results');
+    var doctor = document.getElementById('doctor_id');
+    var dateInput = document.getElementById('date');
+    var timeInput = document.getElementById('time');
+    var duration = document.getElementById('duration');
+
+    function showMessage(text) {
+        results.innerHTML = '';
+        var item = document.createElement('div');
+        item.className = 'list-group-item text-muted';
+        item.textContent = text;
+        results.appendChild(item);
+    }
+
+    function showSlots(slots) {
+        if (!slots.length) {
+            showMessage('No free slots found.');
+            return;
+        }
+        results.innerHTML = '';
+        slots.forEach(function (slot) {
+            var item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            item.textContent = slot.date + ' ' + slot.time + ' - ' + slot.doctor_name;
+            item.addEventListener('click', function () {
+                doctor.value = slot.doctor_id;
+                dateInput.value = slot.date;
+                timeInput.value = slot.time;
+                results.querySelectorAll('.active').forEach(function (active) {
+                    active.classList.remove('active');
+                });
+                item.classList.add('active');
+            });
+            results.appendChild(item);
+        });
+    }
+
+    document.getElementById('availability-search').addEventListener('click', function () {
+        var params = new URLSearchParams({
+            department: department.value,
+            date: from.value,
+            duration: duration.value
+        });
+        showMessage('Searching...');
+        fetch(panel.dataset.url + '?' + params.toString(), {credentials: 'same-origin'})
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                if (data.error) {
+                    showMessage(data.error);
+                } else {
+                    showSlots(data.results || []);
+                }
+            })
+            .catch(function () { showMessage('Could not load free slots.'); });
+    });
+})();
@@ -0,0 +1,56 @@
+// Typeahead for patient fields rendered by fields.PatientField
+document.querySelectorAll('.patient-lookup').forEach(function (input) {
+    var hidden = document.getElementById(input.dataset.target);
+    var results = input.parentNode.querySelector('.patient-lookup-results');
+    var timer = null;
+    var latest = 0;
+
+    function clearResults() {
+        results.innerHTML = '';
+    }
+
+    function showResults(patients) {
+        clearResults();
+        patients.forEach(function (patient) {
+            var item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            var label = patient.name + (patient.phone ? ' (' + patient.phone + ')' : '');
+            item.textContent = label + (patient.date_of_birth ? ' - ' + patient.date_of_birth : '');
+            item.addEventListener('click', function () {
+                hidden.value = patient.id;
+                input.value = label;
+                clearResults();
+            });
+            results.appendChild(item);
+        });
+    }
+
+    input.addEventListener('input', function () {
+        // Typing invalidates the previous selection
+        hidden.value = '';
+        clearTimeout(timer);
+        var q = input.value.trim();
+        if (q.length < 2) {
+            clearResults();
+            return;
+        }
+        timer = setTimeout(function () {
+            var request = ++latest;
+            fetch(input.dataset.url + '?q=' + encodeURIComponent(q), {credentials: 'same-origin'})
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    // Ignore responses for queries the user has already typed past
+                    if (request === latest) {
+                        showResults(data.results || []);
+                    }
+                });
+        }, 200);
+    });
+
+    document.addEventListener('click', function (event) {
+        if (!input.parentNode.contains(event.target)) {
+            clearResults();
+        }
+    });
+});
@@ -0,0 +1,107 @@
+import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from extensions import supabase_client
+from instrumentation import propagate
+
+def _count(response):
+    return response.count if hasattr(response, 'count') else 0
+
+def _patient_count():
+    return _count(supabase_client.table('patients').select('count', count='exact').execute())
+
+def _appointment_count():
+    return _count(supabase_client.table('appointments').select('count', count='exact').execute())
+
+def _today_appointment_count(today):
+    return _count(supabase_client.table('appointments').select('count', count='exact').eq('date', today).execute())
+
+def _doctor_count():
+    return _count(supabase_client.table('users').select('count', count='exact').eq('role', 'doctor').execute())
+
+class DashboardStats:
+    """Dashboard counters fetched concurrently and cached with stale-while-revalidate.
+
+    Values younger than `ttl` are served as-is. Values older than `ttl` but
+    younger than `stale_ttl` are served immediately while a single background
+    refresh runs. Anything older is fetched synchronously.
+    """
+
+    def __init__(self, ttl=30, stale_ttl=300, max_workers=4):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dashboard-stats')
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._value = None
+        self._fetched_at = 0.0
+        self._day = None
+        # Bumped by invalidate(); a fetch started under an older generation
+        # must not overwrite the cache with what it read before the change
+        self._generation = 0
+
+    def _fetch(self):
+        with self._lock:
+            generation = self._generation
+        today = datetime.date.today().isoformat()
+        # Fire all count queries at once
+        futures = {
+            'patient_count': self._executor.submit(propagate(_patient_count)),
+            'appointment_count': self._executor.submit(propagate(_appointment_count)),
+            'today_appointment_count': self._executor.submit(propagate(_today_appointment_count), today),
+            'doctor_count': self._executor.submit(propagate(_doctor_count))
+        }
+        value = {name: future.result() for name, future in futures.items()}
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+                self._fetched_at = time.monotonic()
+                self._day = today
+        return value
+
+    def _background_refresh(self):
+        try:
+            self._fetch()
+        except Exception as e:
+            print(f"Error refreshing dashboard stats: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _cached(self):
+        # Today's count is meaningless once the date rolls over
+        if self._value is None or self._day != datetime.date.today().isoformat():
+            return None, None
+        return self._value, time.monotonic() - self._fetched_at
+
+    def get(self):
+        with self._lock:
+            value, age = self._cached()
+            if value is not None and age < self.ttl:
+                return value
+            if value is not None and age < self.stale_ttl:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._background_refresh, daemon=True).start()
+                return value
+        
+        # Only one request fetches on a cold cache, the rest wait for its result
+        with self._fetch_lock:
+            with self._lock:
+                value, age = self._cached()
+            if value is not None and age < self.ttl:
+                return value
+            return self._fetch()
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._value = None
+
+dashboard_stats = DashboardStats(
+    ttl=Config.DASHBOARD_STATS_TTL,
+    stale_ttl=Config.DASHBOARD_STATS_STALE_TTL
+)
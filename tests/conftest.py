@@ -0,0 +1,41 @@
+import os
+import sys
+import pytest
+
+# The app's modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope='session')
+def dataset():
+    """A small synthetic dataset served from the in-memory backend"""
+    from benchmarks.dataset import generate
+    return generate(patients=50, appointments=200, invoices=20, records=20, doctors=5, seed=7)
+
+@pytest.fixture(scope='session')
+def app(dataset):
+    from benchmarks.run import build_app
+    tables, admin_id = dataset
+    return build_app(tables)
+
+@pytest.fixture
+def client(app, dataset):
+    tables, admin_id = dataset
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = admin_id
+        session['_fresh'] = True
+    return client
+
+@pytest.fixture
+def queried_tables(monkeypatch):
+    """Names of the tables queried during the test, in order"""
+    from extensions import supabase_client
+    names = []
+    table = supabase_client.table
+
+    def recording_table(name):
+        names.append(name)
+        return table(name)
+
+    monkeypatch.setattr(supabase_client, 'table', recording_table)
+    return names
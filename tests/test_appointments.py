@@ -0,0 +1,46 @@
+def _appointment(dataset, status='scheduled'):
+    tables, admin_id = dataset
+    return next(row for row in tables['appointments'] if row['status'] == status)
+
+def _form(appointment, **changes):
+    data = {
+        'patient_id': appointment['patient_id'],
+        'doctor_id': appointment['doctor_id'],
+        'date': str(appointment['date']),
+        'time': str(appointment['time'])[:5],
+        'duration': appointment.get('duration') or 30,
+        'reason': appointment['reason'],
+        'status': appointment['status'],
+        'notes': ''
+    }
+    data.update(changes)
+    return data
+
+def _patient(dataset, patient_id):
+    tables, admin_id = dataset
+    return next(row for row in tables['patients'] if row['id'] == patient_id)
+
+def test_edit_shows_the_embedded_patient_without_another_query(client, dataset, queried_tables):
+    appointment = _appointment(dataset)
+    response = client.get(f"/appointments/edit/{appointment['id']}")
+    assert response.status_code == 200
+    assert _patient(dataset, appointment['patient_id'])['name'].encode() in response.data
+    assert 'patients' not in queried_tables
+
+def test_invalid_edit_reuses_the_embedded_patient(client, dataset, queried_tables):
+    appointment = _appointment(dataset)
+    # Too short a duration fails validation, so the form is shown again
+    response = client.post(f"/appointments/edit/{appointment['id']}", data=_form(appointment, duration=1))
+    assert response.status_code == 200
+    assert _patient(dataset, appointment['patient_id'])['name'].encode() in response.data
+    assert 'patients' not in queried_tables
+
+def test_invalid_edit_for_another_patient_fetches_that_patient(client, dataset, queried_tables):
+    tables, admin_id = dataset
+    appointment = _appointment(dataset)
+    other = next(row for row in tables['patients'] if row['id'] != appointment['patient_id'])
+    response = client.post(f"/appointments/edit/{appointment['id']}",
+                           data=_form(appointment, patient_id=other['id'], duration=1))
+    assert response.status_code == 200
+    assert other['name'].encode() in response.data
+    assert queried_tables.count('patients') == 1
@@ -0,0 +1,87 @@
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from config import Config
+
+THUMBNAIL_PREFIX = 'thumbnails/'
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def thumbnail_name(object_name):
+    return f"{THUMBNAIL_PREFIX}{os.path.splitext(object_name)[0]}.jpg"
+
+def has_preview(object_name):
+    return object_name.lower().endswith(IMAGE_EXTENSIONS + ('.pdf',))
+
+def thumbnail_url(attachment_url):
+    """Public URL of the preview stored next to an attachment, or None if it can't have one"""
+    if not attachment_url:
+        return None
+    # Public URLs may carry a trailing '?' from the storage client
+    url = attachment_url.split('?')[0]
+    object_name = os.path.basename(url)
+    if not has_preview(object_name):
+        return None
+    return url[:-len(object_name)] + thumbnail_name(object_name)
+
+def _preview_image(data, object_name):
+    from PIL import Image
+    name = object_name.lower()
+    if name.endswith(IMAGE_EXTENSIONS):
+        return Image.open(io.BytesIO(data))
+    if name.endswith('.pdf'):
+        # Scanned documents carry the page as an embedded image
+        from PyPDF2 import PdfReader
+        page = PdfReader(io.BytesIO(data)).pages[0]
+        for image in page.images:
+            return Image.open(io.BytesIO(image.data))
+    return None
+
+def _render_thumbnail(object_name, bucket):
+    # Runs in a worker process
+    from extensions import supabase_client
+    data = supabase_client.storage.from_(bucket).download(object_name)
+    image = _preview_image(data, object_name)
+    if image is None:
+        return None
+    image.thumbnail(THUMBNAIL_SIZE)
+    output = io.BytesIO()
+    image.convert('RGB').save(output, 'JPEG', quality=80, optimize=True)
+    name = thumbnail_name(object_name)
+    supabase_client.storage.from_(bucket).upload(name, output.getvalue(), {
+        'content-type': 'image/jpeg',
+        'cache-control': '86400',
+        'upsert': 'true'
+    })
+    return name
+
+def _pool_executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Forking a threaded server could hand children locks held by other
+            # threads; start them clean from a forkserver (spawn where unsupported)
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(max_workers=Config.THUMBNAIL_WORKERS,
+                                        mp_context=multiprocessing.get_context(method))
+        return _pool
+
+def _log_failure(future):
+    error = future.exception()
+    if error is not None:
+        print(f"Error generating thumbnail: {error}")
+
+def schedule_thumbnail(object_name, bucket):
+    """Generate a preview for an uploaded attachment without blocking the request"""
+    if not Config.THUMBNAIL_WORKERS or not has_preview(object_name):
+        return
+    try:
+        future = _pool_executor().submit(_render_thumbnail, object_name, bucket)
+        future.add_done_callback(_log_failure)
+    except Exception as e:
+        print(f"Error scheduling thumbnail: {e}")